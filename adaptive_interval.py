@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+
+class AdaptiveInterval:
+    """Adjusts the poll interval to what the Modbus link sustains.
+
+    After every poll cycle record() is called with the time the cycle spent on Modbus and whether it
+    failed. Cycles that keep the link busy for more than max_utilization of the interval, and failed cycles
+    once the exponentially weighted error rate exceeds max_error_rate, multiply the interval by
+    backoff_factor (multiplicative decrease of the poll rate). A single failed cycle only keeps the
+    interval where it is. Healthy cycles shorten it by step_ms (additive increase), but never below
+    what keeps the link busy for more than min_utilization of the interval. The interval always stays
+    between min_ms and max_ms.
+    """
+
+    def __init__(self, initial_ms, min_ms, max_ms, step_ms=100, backoff_factor=2.0, min_utilization=0.5, max_utilization=0.8, max_error_rate=0.3):
+        self.min_ms = min_ms
+        self.max_ms = max(min_ms, max_ms)
+        self.step_ms = step_ms
+        self.backoff_factor = backoff_factor
+        self.min_utilization = min_utilization
+        self.max_utilization = max_utilization
+        self.max_error_rate = max_error_rate
+        self.interval_ms = self._clamp(initial_ms)
+        self.error_rate = 0.0  # exponentially weighted share of failed cycles
+
+    def _clamp(self, interval_ms):
+        return int(min(self.max_ms, max(self.min_ms, interval_ms)))
+
+    def record(self, duration, error=False):
+        """Feed the Modbus time of one cycle in seconds, returns the new interval in ms"""
+        self.error_rate = 0.8 * self.error_rate + (0.2 if error else 0.0)
+        duration_ms = duration * 1000
+        if duration_ms > self.interval_ms * self.max_utilization or (error and self.error_rate > self.max_error_rate):
+            self.interval_ms = self._clamp(self.interval_ms * self.backoff_factor)
+        elif not error:
+            self.interval_ms = self._clamp(max(self.interval_ms - self.step_ms, duration_ms / self.min_utilization))
+        return self.interval_ms
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import time
+from enum import Enum
+
+# Shortest time the breaker stays open in seconds, BackoffInSeconds may be 0 and 0 doubled stays 0
+MIN_RESET_TIMEOUT = 1
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"  # polling normally
+    OPEN = "open"  # the device is considered unreachable, polls are skipped until the next probe is due
+    HALF_OPEN = "half-open"  # the next poll cycle is a probe, its outcome closes or reopens the breaker
+
+
+class CircuitBreaker:
+    """Keeps the driver from hammering an unreachable device, instead of restarting the whole process.
+
+    After failure_threshold failed poll cycles in a row the breaker opens. While it's open allow()
+    returns False, until reset_timeout seconds have passed. Then it lets one cycle through as a probe:
+    success closes the breaker, failure opens it again with a reset_timeout grown by backoff_factor.
+    """
+
+    def __init__(self, logger, name, failure_threshold=5, reset_timeout=1, backoff_factor=2.0, max_reset_timeout=60):
+        self.logger = logger
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = max(reset_timeout, MIN_RESET_TIMEOUT)
+        self.backoff_factor = backoff_factor
+        self.max_reset_timeout = max_reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._timeout = self.reset_timeout
+        self._retry_at = 0
+
+    @property
+    def is_open(self):
+        return self.state == BreakerState.OPEN
+
+    @property
+    def is_probing(self):
+        return self.state == BreakerState.HALF_OPEN
+
+    def retry_in(self):
+        """Seconds until allow() lets the next poll cycle through, 0 unless the breaker is open"""
+        if self.state != BreakerState.OPEN:
+            return 0.0
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def allow(self):
+        """Return True if the next poll cycle should talk to the device"""
+        if self.state == BreakerState.OPEN:
+            if time.monotonic() < self._retry_at:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self.logger.debug(f"Probing {self.name}")
+        return True
+
+    def record_success(self):
+        if self.state != BreakerState.CLOSED:
+            self.logger.info(f"Connection to {self.name} recovered")
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._timeout = self.reset_timeout
+
+    def record_failure(self):
+        if self.state == BreakerState.OPEN:
+            # A late result of a request that was sent before the breaker opened
+            return
+        self.failures += 1
+        if self.state == BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = BreakerState.OPEN
+            self._retry_at = time.monotonic() + self._timeout
+            self.logger.warning(f"Connection to {self.name} lost, next probe in {self._timeout} seconds")
+            self._timeout = min(self._timeout * self.backoff_factor, self.max_reset_timeout)
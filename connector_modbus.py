@@ -2,59 +2,314 @@
 # Please adhere to flake8 --ignore E501,E402
 
 import logging
+import time
 
+from sun2000_modbus import alarms
+from sun2000_modbus import discovery
 from sun2000_modbus import inverter
 from sun2000_modbus import inverter_registers
 from sun2000_modbus import meter_registers
+from sun2000_modbus import planner
+from sun2000_modbus.metrics import Metrics
+from sun2000_modbus.polling import PollClass, PollScheduler
+from sun2000_modbus.rtt import RttEstimator
 
-from dbus.mainloop.glib import DBusGMainLoop
-
-from settings import HuaweiSUN2000Settings
-
-state1Readable = {
-    1: "standby",
-    2: "grid connected",
-    4: "grid connected normally",
-    8: "derating due to power rationing",
-    16: "derating due to internal causes of the solar inverter",
-    32: "normal stop",
-    64: "stop due to faults",
-    128: "stop due to power",
-    256: "shutdown",
-    512: "spot check"
-}
-
-state2Readable = {
-    1: "locking status (0:locked;1:unlocked)",
-    2: "pv connection status (0:disconnected;1:connected)",
-    4: "grid connected normally",
-    8: "derating due to power rationing",
-    16: "derating due to internal causes of the solar inverter",
-    32: "normal stop",
-    64: "stop due to faults",
-    128: "stop due to power",
-    256: "shutdown",
-    512: "spot check"
-}
-
-state3Readable = {
-    1: "off-grid(0:on-grid;1:off-grid",
-    2: "off-grid-switch(0:disable;1:enable)"
-}
-
-alert1Readable = {
-    1: "",
-    2: ""
-}
+
+class ReadData(dict):
+    """The data of a service (dbus path -> value), read_times holds the monotonic time of the Modbus read behind each value"""
+
+    def __init__(self, values=(), read_times=None):
+        super().__init__(values)
+        self.read_times = read_times if read_times is not None else {}
 
 
 class ModbusDataCollector2000:
-    def __init__(self, logger, modbus_version, host='192.168.200.1', port=6607, modbus_unit=0, pcf_override=0.995, system_type=0, max_retries=3, backoff_in_seconds=1, backoff_factor=2.0):
-        self.invSun2000 = inverter.Sun2000(logger=logger, host=host, port=port, modbus_unit=modbus_unit, timeout=20, max_retries=max_retries, backoff_in_seconds=backoff_in_seconds, backoff_factor=backoff_factor)
+    def __init__(self, logger, modbus_version, host='192.168.200.1', port=6607, modbus_unit=0, pcf_override=0.995, system_type=0, max_retries=3, backoff_in_seconds=1, backoff_factor=2.0, max_gap=8, slow_poll_interval=60, async_mode=False, burst_mode=False, client=None, async_client=None, pipeline_window=1, min_timeout=0.3, max_timeout=20, rtt=None, device_cache=None, metrics=None):
+        # With modbus_version AUTO the register map is detected by getStaticData(), until then V3 is assumed
+        self.this_inverter = inverter_registers.InverterRegister.get(modbus_version)
+        self.auto_version = modbus_version == "AUTO"
+        # discovery.DeviceCache with the registers each device (by serial number) doesn't support
+        self.device_cache = device_cache
+        self.unsupported = set()
+        # Addresses the device rejects, a block may not bridge them with a gap
+        self.holes = frozenset()
+        # Request timeouts follow the measured round trip time of the connection, collectors sharing a connection share this as well
+        self.rtt = rtt if rtt is not None else RttEstimator(min_timeout=min_timeout, max_timeout=max_timeout)
+        # Shared the same way, see sun2000_modbus/metrics.py
+        self.metrics = metrics if metrics is not None else Metrics(f'{host}:{port}')
+        # DeviceStatus exists in every register map and is cheap to read, which makes it a good readiness probe
+        self.invSun2000 = inverter.Sun2000(logger=logger, host=host, port=port, modbus_unit=modbus_unit, timeout=max_timeout, max_retries=max_retries, backoff_in_seconds=backoff_in_seconds, backoff_factor=backoff_factor,
+                                           probe_address=self.this_inverter.DeviceStatus.value.address, client=client, pipeline_window=pipeline_window, rtt=self.rtt, metrics=self.metrics)
+        self.modbus_unit = modbus_unit
+        # Collectors with the same connection key talk through the same TCP connection
+        self.connection = (host, port)
         self.logger = logger
         self.pcf_override = pcf_override
         self.system_type = system_type
-        self.this_inverter = inverter_registers.InverterRegister.get(modbus_version)
+        # Number of PV strings to publish, set by getStaticData()
+        self.pv_strings = 0
+        self.alarm_monitor = alarms.AlarmMonitor(logger)
+        # Number of unused registers we're willing to read in order to merge two reads into one request
+        self.max_gap = max_gap
+        self.poll_scheduler = PollScheduler(slow_interval=slow_poll_interval)
+        # In burst mode the connection is only open while a poll cycle is running
+        self.burst_mode = burst_mode
+        self.cycle_stats = {'connect': 0.0, 'read': 0.0, 'idle': 0.0}
+        self._cycle_started = None
+        self._cycle_ended = None
+        # Everything the data methods asked for in the last cycle, see beginCycle()
+        self._cycle_polls = {}
+        if async_mode and async_client is None:
+            # Only needed (and only importable) when running inside the GLib main loop
+            from sun2000_modbus.async_client import GLibModbusClient
+            self.async_client = GLibModbusClient(logger=logger, host=host, port=port, modbus_unit=modbus_unit, timeout=max_timeout, window=pipeline_window, rtt=self.rtt, metrics=self.metrics)
+        else:
+            self.async_client = async_client
+
+    def beginCycle(self):
+        """Called once before each poll cycle (all services)"""
+        self._cycle_started = time.monotonic()
+        if self._cycle_ended is not None:
+            self.cycle_stats['idle'] = self._cycle_started - self._cycle_ended
+        self.poll_scheduler.begin_cycle(self._cycle_started)
+        # Also in async mode, where the static data is still read through the blocking client
+        self.invSun2000.begin_cycle()
+        if self.async_client is not None:
+            return
+        if self.burst_mode:
+            # Open the session up front, so the reads of this cycle go out back to back. Without the probe:
+            # it would cost an extra round trip every cycle, the first read tells just as well whether the
+            # device answers, and a failed read goes through the usual disconnect and retry path.
+            self.invSun2000.connect(probe=False)
+        self.cycle_stats['connect'] = time.monotonic() - self._cycle_started
+        if self.invSun2000.pipeline_window > 1 and self._cycle_polls:
+            # Fetch what all data methods (inverter, meter) needed last time in one pipelined batch,
+            # they'll find their values in the cache. Errors show up again when they read themselves.
+            try:
+                self._read_due(self._cycle_polls)
+            except Exception as e:
+                self.logger.debug(f"Prefetching the poll cycle failed: {e}")
+
+    def resetBackoff(self):
+        """Let the next cycle connect right away, even if the reconnect backoff hasn't expired yet"""
+        self.invSun2000.reset_backoff()
+
+    def endCycle(self):
+        """Called once after each poll cycle (all services)"""
+        if self._cycle_started is None:
+            return
+        self._cycle_ended = time.monotonic()
+        if self.burst_mode:
+            self.invSun2000.disconnect()
+        self.cycle_stats['read'] = self._cycle_ended - self._cycle_started - self.cycle_stats['connect']
+        self.logger.debug("Poll cycle: connect {connect:.3f} s, read {read:.3f} s, idle {idle:.3f} s".format(**self.cycle_stats))
+
+    def _read_due(self, polls):
+        """Read the registers of polls (a dict register -> PollClass) that are due and return all values, cached or fresh"""
+        self._cycle_polls.update(polls)
+        now = time.monotonic()
+        due = [register for register in self.poll_scheduler.due(polls, now) if register not in self.unsupported]
+        if due:
+            values = self.invSun2000.read_registers(due, max_gap=self.max_gap, holes=self.holes)
+            # Stamped when the reads are done, which is what the published values' age is measured from
+            self.poll_scheduler.update(values, time.monotonic())
+        return self.poll_scheduler.values
+
+    def _read_due_async(self, polls, build, callback, what):
+        """Like _read_due(), but the blocks are fetched by the non-blocking client and callback(build(values)) is called once all have arrived"""
+        now = time.monotonic()
+        due = [register for register in self.poll_scheduler.due(polls, now) if register not in self.unsupported]
+        blocks = planner.plan_blocks(due, max_gap=self.max_gap, holes=self.holes)
+        state = {'pending': len(blocks), 'failed': False}
+
+        def finish():
+            try:
+                data = build(self.poll_scheduler.values)
+            except Exception as e:
+                self.logger.error(f"Error getting {what} data via Modbus TCP: {e}")
+                data = None
+            callback(data)
+
+        def on_block(block, payload, error):
+            if state['failed']:
+                return
+            if error is not None:
+                # One failed block fails the whole cycle, just like in the blocking code path
+                state['failed'] = True
+                self.logger.error(f"Error getting {what} data via Modbus TCP: {error}")
+                callback(None)
+                return
+            started = time.monotonic()
+            values = block.decode(payload)
+            self.metrics.observe('decode', time.monotonic() - started)
+            self.poll_scheduler.update(values, time.monotonic())
+            state['pending'] -= 1
+            if state['pending'] == 0:
+                finish()
+
+        if not blocks:
+            finish()
+        for block in blocks:
+            self.async_client.read_range(block.start_address, block.quantity, lambda payload, error, block=block: on_block(block, payload, error), unit=self.modbus_unit)
+
+    def _inverter_paths(self):
+        if self.system_type == 1:
+            # Three phase inverter
+            dbuspath = {
+                '/Ac/Power': {'initial': 0, "sun2000": self.this_inverter.ActivePower},
+                '/Ac/L1/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseACurrent},
+                '/Ac/L1/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseAVoltage},
+                '/Ac/L2/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseBCurrent},
+                '/Ac/L2/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseBVoltage},
+                '/Ac/L3/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseCCurrent},
+                '/Ac/L3/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseCVoltage},
+                '/Dc/Power': {'initial': 0, "sun2000": self.this_inverter.InputPower},
+                '/Ac/MaxPower': {'initial': 0, "sun2000": self.this_inverter.MaximumActivePower, "poll": PollClass.SLOW},
+            }
+        else:
+            # Single phase inverter
+            dbuspath = {
+                '/Ac/Power': {'initial': 0, "sun2000": self.this_inverter.ActivePower},
+                '/Ac/L1/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseACurrent},
+                '/Ac/L1/Voltage': {'initial': 0, "sun2000": self.this_inverter.LineVoltageBetweenPhasesAAndB},
+                '/Dc/Power': {'initial': 0, "sun2000": self.this_inverter.InputPower},
+                '/Ac/MaxPower': {'initial': 0, "sun2000": self.this_inverter.MaximumActivePower, "poll": PollClass.SLOW},
+            }
+        return dbuspath
+
+    def _pv_registers(self, count=None):
+        """(voltage, current) register pairs of the first count PV strings, all of them if count is None"""
+        members = self.this_inverter.__members__
+        pairs = []
+        n = 1
+        while f'PV{n}Voltage' in members and (count is None or n <= count):
+            pairs.append((members[f'PV{n}Voltage'], members[f'PV{n}Current']))
+            n += 1
+        return pairs
+
+    def _bitfield_registers(self):
+        """The State and Alarm registers of the register map, V1 and V2 don't have them"""
+        members = self.this_inverter.__members__
+        return [members[name] for name in list(alarms.STATES) + list(alarms.ALARMS) if name in members]
+
+    def _inverter_polls(self, dbuspath):
+        polls = {v.get("sun2000"): v.get("poll", PollClass.FAST) for v in dbuspath.values()}
+        # The string registers (from 32016) follow the state and alarm registers and are read in one request with them.
+        # The AC values (from 32064) only join that request when the strings reach up to there, i.e. with 24 strings.
+        for voltage, current in self._pv_registers(self.pv_strings):
+            polls[voltage] = PollClass.FAST
+            polls[current] = PollClass.FAST
+        # State1 (32000) to Alarm3 (32010) with a few gaps
+        for register in self._bitfield_registers():
+            polls[register] = PollClass.FAST
+        polls[self.this_inverter.DeviceStatus] = PollClass.FAST
+        # The energy counter only moves every few minutes
+        polls[self.this_inverter.AccumulatedEnergyYield] = PollClass.SLOW
+        polls[self.this_inverter.PowerFactor] = PollClass.FAST
+        polls[self.this_inverter.GridFrequency] = PollClass.FAST
+        return polls
+
+    def _timestamped(self, data, dbuspath, default, sources=None):
+        """Return data as ReadData with the time each value's register was read.
+
+        Paths mapped to a register by dbuspath or sources get that register's read time, the others are derived from
+        the fast registers and get the read time of default.
+        """
+        last_read = self.poll_scheduler.last_read
+        registers = {path: v.get("sun2000") for path, v in dbuspath.items()}
+        registers.update(sources or {})
+        return ReadData(data, {path: last_read.get(registers.get(path, default)) for path in data})
+
+    def _build_inverter_data(self, dbuspath, values):
+        data = {}
+
+        for k, v in dbuspath.items():
+            s = v.get("sun2000")
+            data[k] = values[s]
+
+        data['/Status'] = self.invSun2000.format_value(self.this_inverter.DeviceStatus, values[self.this_inverter.DeviceStatus])
+
+        # Matching the DeviceStatus code mapping to the
+        # codes for 'pvinverter' from the Victron dbus manual
+        # https://github.com/victronenergy/venus/wiki/dbus#pv-inverters
+        # 0=Startup 0; 1=Startup 1; 2=Startup 2; 3=Startup 3;
+        # 4=Startup 4; 5=Startup 5; 6=Startup 6; 7=Running;
+        # 8=Standby; 9=Boot loading; 10=Error
+        match data['/Status']:
+            case "Starting":
+                data['/StatusCode'] = 0
+            case "On-grid":
+                data['/StatusCode'] = 7
+            case "Grid connection: power limited":
+                data['/StatusCode'] = 7
+            case "Grid connection: self-derating":
+                data['/StatusCode'] = 7
+            case "Shutdown: fault":
+                data['/StatusCode'] = 10
+            case "Shutdown: command":
+                data['/StatusCode'] = 10
+            case "Shutdown: OVGR":
+                data['/StatusCode'] = 10
+            case "Shutdown: communication disconnected":
+                data['/StatusCode'] = 10
+            case "Shutdown: power limited":
+                data['/StatusCode'] = 10
+            case "Shutdown: manual startup required":
+                data['/StatusCode'] = 10
+            case "Shutdown: DC switches disconnected":
+                data['/StatusCode'] = 10
+            case "Shutdown: rapid cutoff":
+                data['/StatusCode'] = 10
+            case "Shutdown: input underpowered":
+                data['/StatusCode'] = 10
+            case "Standby: no irradiation":
+                data['/StatusCode'] = 8
+            case _:
+                data['/StatusCode'] = 7  # Let's put the default to "running" (7)
+
+        energy_forward = values[self.this_inverter.AccumulatedEnergyYield]
+        data['/Ac/Energy/Forward'] = energy_forward
+
+        cosphi = float(values[self.this_inverter.PowerFactor])
+        # This is a sanity check, if the value is too low, it's probably wrong and we override it with the value
+        # from the config
+        if cosphi < 0.8:
+            cosphi = self.pcf_override
+
+        freq = values[self.this_inverter.GridFrequency]
+
+        for n, (voltage, current) in enumerate(self._pv_registers(self.pv_strings), start=1):
+            data[f'/Pv/{n}/V'] = values[voltage]
+            data[f'/Pv/{n}/I'] = values[current]
+            data[f'/Pv/{n}/P'] = round(values[voltage] * values[current], 1)
+
+        # Only the alarms that changed (and /ErrorCode with them)
+        data.update(self.alarm_monitor.update({register.name: values[register] for register in self._bitfield_registers()}))
+
+        # There is no Modbus register for the phases
+        data['/Ac/L1/Frequency'] = freq
+
+        if self.system_type == 0:
+            # Single phase inverter
+            data['/Ac/L1/Energy/Forward'] = round(energy_forward, 2)
+            data['/Ac/L1/Power'] = float(data['/Ac/Power'])
+
+        if self.system_type == 1:
+            # Three phase inverter
+            data['/Ac/L1/Energy/Forward'] = round(energy_forward / 3.0, 2)
+            data['/Ac/L2/Energy/Forward'] = round(energy_forward / 3.0, 2)
+            data['/Ac/L3/Energy/Forward'] = round(energy_forward / 3.0, 2)
+            data['/Ac/L2/Frequency'] = freq
+            data['/Ac/L3/Frequency'] = freq
+            data['/Ac/L1/Power'] = cosphi * float(data['/Ac/L1/Voltage']) * float(data['/Ac/L1/Current'])
+            data['/Ac/L2/Power'] = cosphi * float(data['/Ac/L2/Voltage']) * float(data['/Ac/L2/Current'])
+            data['/Ac/L3/Power'] = cosphi * float(data['/Ac/L3/Voltage']) * float(data['/Ac/L3/Current'])
+
+        energy = self.this_inverter.AccumulatedEnergyYield
+        sources = {path: energy for path in ('/Ac/Energy/Forward', '/Ac/L1/Energy/Forward', '/Ac/L2/Energy/Forward', '/Ac/L3/Energy/Forward')}
+        for n, (voltage, current) in enumerate(self._pv_registers(self.pv_strings), start=1):
+            sources.update({f'/Pv/{n}/V': voltage, f'/Pv/{n}/I': current, f'/Pv/{n}/P': voltage})
+        return self._timestamped(data, dbuspath, self.this_inverter.DeviceStatus, sources)
 
     def getInverterData(self):
         # the connect() method internally checks whether there's already a connection
@@ -63,111 +318,74 @@ class ModbusDataCollector2000:
             return None
 
         try:
-            data = {}
-
-            if self.system_type == 1:
-                # Three phase inverter
-                dbuspath = {
-                    '/Ac/Power': {'initial': 0, "sun2000": self.this_inverter.ActivePower},
-                    '/Ac/L1/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseACurrent},
-                    '/Ac/L1/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseAVoltage},
-                    '/Ac/L2/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseBCurrent},
-                    '/Ac/L2/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseBVoltage},
-                    '/Ac/L3/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseCCurrent},
-                    '/Ac/L3/Voltage': {'initial': 0, "sun2000": self.this_inverter.PhaseCVoltage},
-                    '/Dc/Power': {'initial': 0, "sun2000": self.this_inverter.InputPower},
-                    '/Ac/MaxPower': {'initial': 0, "sun2000": self.this_inverter.MaximumActivePower},
-                }
-            else:
-                # Single phase inverter
-                dbuspath = {
-                    '/Ac/Power': {'initial': 0, "sun2000": self.this_inverter.ActivePower},
-                    '/Ac/L1/Current': {'initial': 0, "sun2000": self.this_inverter.PhaseACurrent},
-                    '/Ac/L1/Voltage': {'initial': 0, "sun2000": self.this_inverter.LineVoltageBetweenPhasesAAndB},
-                    '/Dc/Power': {'initial': 0, "sun2000": self.this_inverter.InputPower},
-                    '/Ac/MaxPower': {'initial': 0, "sun2000": self.this_inverter.MaximumActivePower},
-                }
-
-            for k, v in dbuspath.items():
-                s = v.get("sun2000")
-                data[k] = self.invSun2000.read(s)
-
-            data['/Status'] = self.invSun2000.read_formatted(self.this_inverter.DeviceStatus)
-
-            # Matching the DeviceStatus code mapping to the
-            # codes for 'pvinverter' from the Victron dbus manual
-            # https://github.com/victronenergy/venus/wiki/dbus#pv-inverters
-            # 0=Startup 0; 1=Startup 1; 2=Startup 2; 3=Startup 3;
-            # 4=Startup 4; 5=Startup 5; 6=Startup 6; 7=Running;
-            # 8=Standby; 9=Boot loading; 10=Error
-            match data['/Status']:
-                case "Starting":
-                    data['/StatusCode'] = 0
-                case "On-grid":
-                    data['/StatusCode'] = 7
-                case "Grid connection: power limited":
-                    data['/StatusCode'] = 7
-                case "Grid connection: self-derating":
-                    data['/StatusCode'] = 7
-                case "Shutdown: fault":
-                    data['/StatusCode'] = 10
-                case "Shutdown: command":
-                    data['/StatusCode'] = 10
-                case "Shutdown: OVGR":
-                    data['/StatusCode'] = 10
-                case "Shutdown: communication disconnected":
-                    data['/StatusCode'] = 10
-                case "Shutdown: power limited":
-                    data['/StatusCode'] = 10
-                case "Shutdown: manual startup required":
-                    data['/StatusCode'] = 10
-                case "Shutdown: DC switches disconnected":
-                    data['/StatusCode'] = 10
-                case "Shutdown: rapid cutoff":
-                    data['/StatusCode'] = 10
-                case "Shutdown: input underpowered":
-                    data['/StatusCode'] = 10
-                case "Standby: no irradiation":
-                    data['/StatusCode'] = 8
-                case _:
-                    data['/StatusCode'] = 7  # Let's put the default to "running" (7)
-
-            energy_forward = self.invSun2000.read(self.this_inverter.AccumulatedEnergyYield)
-            data['/Ac/Energy/Forward'] = energy_forward
-
-            cosphi = float(self.invSun2000.read((self.this_inverter.PowerFactor)))
-            # This is a sanity check, if the value is too low, it's probably wrong and we override it with the value
-            # from the config
-            if cosphi < 0.8:
-                cosphi = self.pcf_override
-
-            freq = self.invSun2000.read(self.this_inverter.GridFrequency)
-
-            # There is no Modbus register for the phases
-            data['/Ac/L1/Frequency'] = freq
-
-            if self.system_type == 0:
-                # Single phase inverter
-                data['/Ac/L1/Energy/Forward'] = round(energy_forward, 2)
-                data['/Ac/L1/Power'] = float(data['/Ac/Power'])
-
-            if self.system_type == 1:
-                # Three phase inverter
-                data['/Ac/L1/Energy/Forward'] = round(energy_forward / 3.0, 2)
-                data['/Ac/L2/Energy/Forward'] = round(energy_forward / 3.0, 2)
-                data['/Ac/L3/Energy/Forward'] = round(energy_forward / 3.0, 2)
-                data['/Ac/L2/Frequency'] = freq
-                data['/Ac/L3/Frequency'] = freq
-                data['/Ac/L1/Power'] = cosphi * float(data['/Ac/L1/Voltage']) * float(data['/Ac/L1/Current'])
-                data['/Ac/L2/Power'] = cosphi * float(data['/Ac/L2/Voltage']) * float(data['/Ac/L2/Current'])
-                data['/Ac/L3/Power'] = cosphi * float(data['/Ac/L3/Voltage']) * float(data['/Ac/L3/Current'])
-
-            return data
+            dbuspath = self._inverter_paths()
+            # Fetch everything that is due in this cycle in as few requests as possible
+            values = self._read_due(self._inverter_polls(dbuspath))
+            return self._build_inverter_data(dbuspath, values)
 
         except Exception as e:
             self.logger.error("Error getting inverter data via Modbus TCP: " + str(e))
             return None
 
+    def requestInverterData(self, callback):
+        """Non-blocking counterpart of getInverterData(), callback(data) is called from the GLib main loop"""
+        dbuspath = self._inverter_paths()
+        self._read_due_async(self._inverter_polls(dbuspath), lambda values: self._build_inverter_data(dbuspath, values), callback, "inverter")
+
+    def _meter_paths(self):
+        if self.system_type == 1:
+            # Three phase meter
+            dbuspath = {
+                '/DeviceType': {'initial': 0, "sun2000": meter_registers.MeterRegister.MeterType, "poll": PollClass.STATIC},
+                '/Ac/Power': {'initial': 0, "sun2000": meter_registers.MeterRegister.ActivePower},
+                '/Ac/L1/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseCurrent},
+                '/Ac/L1/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseVoltage},
+                '/Ac/L2/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.BPhaseCurrent},
+                '/Ac/L2/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.BPhaseVoltage},
+                '/Ac/L3/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.CPhaseCurrent},
+                '/Ac/L3/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.CPhaseVoltage},
+            }
+        else:
+            # Single phase meter
+            dbuspath = {
+                '/DeviceType': {'initial': 0, "sun2000": meter_registers.MeterRegister.MeterType, "poll": PollClass.STATIC},
+                '/Ac/Power': {'initial': 0, "sun2000": meter_registers.MeterRegister.ActivePower},
+                '/Ac/L1/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseCurrent},
+                '/Ac/L1/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseVoltage},
+            }
+        return dbuspath
+
+    def _meter_polls(self, dbuspath):
+        polls = {v.get("sun2000"): v.get("poll", PollClass.FAST) for v in dbuspath.values()}
+        polls[meter_registers.MeterRegister.ReverseActivePower] = PollClass.SLOW
+        polls[meter_registers.MeterRegister.PowerFactor] = PollClass.FAST
+        return polls
+
+    def _build_meter_data(self, dbuspath, values):
+        data = {}
+
+        data['/Ac/Energy/Forward'] = values[meter_registers.MeterRegister.ActivePower] / 1000
+        data['/Ac/Energy/Reverse'] = values[meter_registers.MeterRegister.ReverseActivePower] / 1000
+
+        for k, v in dbuspath.items():
+            s = v.get("sun2000")
+            data[k] = values[s]
+
+        cosphi = abs(float(values[meter_registers.MeterRegister.PowerFactor]))
+        # This is a sanity check, if the value is too low, it's probably wrong and we override it with the value
+        # from the config
+        if cosphi < 0.8:
+            cosphi = self.pcf_override
+
+        data['/Ac/L1/Power'] = -1 * cosphi * float(data['/Ac/L1/Voltage']) * float(data['/Ac/L1/Current'])
+
+        if self.system_type == 1:
+            # Three phase meter
+            data['/Ac/L2/Power'] = -1 * cosphi * float(data['/Ac/L2/Voltage']) * float(data['/Ac/L2/Current'])
+            data['/Ac/L3/Power'] = -1 * cosphi * float(data['/Ac/L3/Voltage']) * float(data['/Ac/L3/Current'])
+
+        return self._timestamped(data, dbuspath, meter_registers.MeterRegister.ActivePower, {'/Ac/Energy/Reverse': meter_registers.MeterRegister.ReverseActivePower})
+
     def getMeterData(self):
         # the connect() method internally checks whether there's already a connection
         if not self.invSun2000.connect():
@@ -201,81 +419,101 @@ class ModbusDataCollector2000:
         """
 
         try:
-            data = {}
-
-            if self.system_type == 1:
-                # Three phase meter
-                dbuspath = {
-                    '/DeviceType': {'initial': 0, "sun2000": meter_registers.MeterRegister.MeterType},
-                    '/Ac/Power': {'initial': 0, "sun2000": meter_registers.MeterRegister.ActivePower},
-                    '/Ac/L1/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseCurrent},
-                    '/Ac/L1/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseVoltage},
-                    '/Ac/L2/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.BPhaseCurrent},
-                    '/Ac/L2/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.BPhaseVoltage},
-                    '/Ac/L3/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.CPhaseCurrent},
-                    '/Ac/L3/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.CPhaseVoltage},
-                }
-            else:
-                # Single phase meter
-                dbuspath = {
-                    '/DeviceType': {'initial': 0, "sun2000": meter_registers.MeterRegister.MeterType},
-                    '/Ac/Power': {'initial': 0, "sun2000": meter_registers.MeterRegister.ActivePower},
-                    '/Ac/L1/Current': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseCurrent},
-                    '/Ac/L1/Voltage': {'initial': 0, "sun2000": meter_registers.MeterRegister.APhaseVoltage},
-                }
-
-            data['/Ac/Energy/Forward'] = self.invSun2000.read(meter_registers.MeterRegister.ActivePower) / 1000
-            data['/Ac/Energy/Reverse'] = self.invSun2000.read(meter_registers.MeterRegister.ReverseActivePower) / 1000
-
-            for k, v in dbuspath.items():
-                s = v.get("sun2000")
-                data[k] = self.invSun2000.read(s)
-
-            cosphi = abs(float(self.invSun2000.read(meter_registers.MeterRegister.PowerFactor)))
-            # This is a sanity check, if the value is too low, it's probably wrong and we override it with the value
-            # from the config
-            if cosphi < 0.8:
-                cosphi = self.pcf_override
-
-            data['/Ac/L1/Power'] = -1 * cosphi * float(data['/Ac/L1/Voltage']) * float(data['/Ac/L1/Current'])
-
-            if self.system_type == 1:
-                # Three phase meter
-                data['/Ac/L2/Power'] = -1 * cosphi * float(data['/Ac/L2/Voltage']) * float(data['/Ac/L2/Current'])
-                data['/Ac/L3/Power'] = -1 * cosphi * float(data['/Ac/L3/Voltage']) * float(data['/Ac/L3/Current'])
-
-            return data
+            dbuspath = self._meter_paths()
+            values = self._read_due(self._meter_polls(dbuspath))
+            return self._build_meter_data(dbuspath, values)
 
         except Exception as e:
             self.logger.error("Error getting meter data via Modbus TCP: " + str(e))
             return None
 
+    def requestMeterData(self, callback):
+        """Non-blocking counterpart of getMeterData(), callback(data) is called from the GLib main loop"""
+        dbuspath = self._meter_paths()
+        self._read_due_async(self._meter_polls(dbuspath), lambda values: self._build_meter_data(dbuspath, values), callback, "meter")
+
+    def _static_registers(self):
+        members = self.this_inverter.__members__
+        return [members[name] for name in ('SN', 'ModelID', 'Model', 'NumberOfPVStrings', 'NumberOfMPPTrackers') if name in members]
+
+    def _discover(self):
+        """Pick the register map (modbus_version AUTO) and find the registers the device rejects, cached per serial number"""
+        register_maps = [inverter_registers.InverterRegisterV3, inverter_registers.InverterRegisterV2] if self.auto_version else [self.this_inverter]
+        self.this_inverter, serial_number = discovery.identify(self.invSun2000, register_maps)
+        self.invSun2000.probe_address = self.this_inverter.DeviceStatus.value.address
+        if self.auto_version:
+            self.logger.info(f"Detected register map {self.this_inverter.__name__}")
+
+        entry = self.device_cache.get(serial_number) if self.device_cache is not None else None
+        # Entries written before the gaps were probed as well are probed again
+        if entry is None or entry['register_map'] != self.this_inverter.__name__ or 'rejected_addresses' not in entry:
+            entry = {'register_map': self.this_inverter.__name__, 'probed': [], 'unsupported': [], 'rejected_addresses': []}
+        # Only registers that weren't probed before, e.g. because a new version of this driver reads more of them
+        registers = set(self._static_registers()) | set(self._inverter_polls(self._inverter_paths()))
+        # The number of strings isn't known yet, probe all of them
+        for pair in self._pv_registers():
+            registers.update(pair)
+        unprobed = [register for register in registers if register.name not in entry['probed']]
+        if unprobed:
+            self.logger.info(f"Probing {len(unprobed)} registers of {serial_number}")
+            unsupported, rejected_addresses = discovery.find_unsupported(self.invSun2000, unprobed, max_gap=self.max_gap)
+            entry['probed'] = sorted(set(entry['probed']) | {register.name for register in unprobed})
+            entry['unsupported'] = sorted(set(entry['unsupported']) | {register.name for register in unsupported})
+            entry['rejected_addresses'] = sorted(set(entry['rejected_addresses']) | rejected_addresses)
+            if self.device_cache is not None:
+                self.device_cache.put(serial_number, entry)
+
+        self.unsupported = {self.this_inverter[name] for name in entry['unsupported'] if name in self.this_inverter.__members__}
+        if self.unsupported:
+            self.logger.info(f"Registers not supported by {serial_number}, reported as 0: {', '.join(sorted(entry['unsupported']))}")
+        for register in self.unsupported:
+            self.poll_scheduler.values[register] = 0
+        # Unsupported registers aren't read any more, which turns their addresses into gaps as well
+        self.holes = frozenset(entry['rejected_addresses']).union(*(range(register.value.address, register.value.address + register.value.quantity) for register in self.unsupported))
+        if entry['rejected_addresses']:
+            self.logger.info(f"Addresses rejected by {serial_number}, not read as part of a gap: {', '.join(map(str, entry['rejected_addresses']))}")
+
     def getStaticData(self):
+        # This is called on its own (and retried) during startup, so it counts as a poll cycle
+        self.beginCycle()
+        try:
+            return self._read_static_data()
+        finally:
+            # E.g. closes the connection again in burst mode
+            self.endCycle()
+
+    def _read_static_data(self):
         # The connect() method internally checks whether there's already a connection
         if not self.invSun2000.connect():
             self.logger.error("Error connecting to Modbus TCP")
             return None
 
         try:
+            if self.auto_version or self.device_cache is not None:
+                self._discover()
             data = {}
-            if 'SN' in self.this_inverter.__members__:
-                data['SN'] = self.invSun2000.read(self.this_inverter.SN)
+            members = {name: register for name, register in self.this_inverter.__members__.items() if register not in self.unsupported}
+            static_registers = [register for register in self._static_registers() if register not in self.unsupported]
+            values = self.invSun2000.read_registers(static_registers, max_gap=self.max_gap, holes=self.holes)
+            if 'SN' in members:
+                data['SN'] = values[self.this_inverter.SN]
             else:
                 data['SN'] = "unknown"
-            if 'ModelID' in self.this_inverter.__members__:
-                data['ModelID'] = self.invSun2000.read(self.this_inverter.ModelID)
+            if 'ModelID' in members:
+                data['ModelID'] = values[self.this_inverter.ModelID]
             else:
                 data['ModelID'] = 0
-            if 'Model' in self.this_inverter.__members__:
-                data['Model'] = str(self.invSun2000.read_formatted(self.this_inverter.Model)).replace('\0', '')
+            if 'Model' in members:
+                data['Model'] = str(self.invSun2000.format_value(self.this_inverter.Model, values[self.this_inverter.Model])).replace('\0', '')
             else:
                 data['Model'] = "unknown"
-            if 'NumberOfPVStrings' in self.this_inverter.__members__:
-                data['NumberOfPVStrings'] = self.invSun2000.read(self.this_inverter.NumberOfPVStrings)
+            if 'NumberOfPVStrings' in members:
+                data['NumberOfPVStrings'] = values[self.this_inverter.NumberOfPVStrings]
             else:
                 data['NumberOfPVStrings'] = 0
-            if 'NumberOfMPPTrackers' in self.this_inverter.__members__:
-                data['NumberOfMPPTrackers'] = self.invSun2000.read(self.this_inverter.NumberOfMPPTrackers)
+            self.pv_strings = len(self._pv_registers(int(data['NumberOfPVStrings'])))
+            if 'NumberOfMPPTrackers' in members:
+                data['NumberOfMPPTrackers'] = values[self.this_inverter.NumberOfMPPTrackers]
             else:
                 data['NumberOfMPPTrackers'] = 0
             return data
@@ -284,9 +522,18 @@ class ModbusDataCollector2000:
             self.logger.error("Error getting static data via Modbus TCP: " + str(e))
             return None
 
+        finally:
+            if self.async_client is not None:
+                # The async client has its own connection, SDongles only accept one at a time
+                self.invSun2000.disconnect()
+
 
 # For testing
 if __name__ == "__main__":
+    # Only needed here, the collector itself runs without dbus (e.g. in tools/benchmark_suite.py)
+    from dbus.mainloop.glib import DBusGMainLoop
+    from settings import HuaweiSUN2000Settings
+
     DBusGMainLoop(set_as_default=True)
     formatter = logging.Formatter("(%(module)s.%(funcName)s) %(levelname)s - %(message)s")
     logger = logging.getLogger(__name__)
@@ -305,7 +552,13 @@ if __name__ == "__main__":
                                         system_type=settings.get("system_type"),
                                         max_retries=settings.get("max_retries"),
                                         backoff_in_seconds=settings.get("backoff_in_seconds"),
-                                        backoff_factor=settings.get("backoff_factor"))
+                                        backoff_factor=settings.get("backoff_factor"),
+                                        max_gap=settings.get("read_gap_fill"),
+                                        slow_poll_interval=settings.get("slow_poll_interval"),
+                                        burst_mode=settings.get("burst_mode") == 1,
+                                        pipeline_window=settings.get("pipeline_window"),
+                                        min_timeout=settings.get("min_timeout_ms") / 1000,
+                                        max_timeout=settings.get("max_timeout_ms") / 1000)
     static_data = collector.getStaticData()
     logger.debug("Static data:")
     for k, v in static_data.items():
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import math
+import time
+
+
+class CycleScheduler:
+    """Keeps poll cycles on a fixed grid of the monotonic clock.
+
+    Each deadline is the previous deadline plus the interval, so neither the time a cycle takes nor
+    the wake-up latency of the main loop adds up over time. When a cycle overruns one or more
+    slots they are skipped, not caught up on, and the next cycle starts at the next free slot.
+    """
+
+    def __init__(self, logger, interval_ms, clock=time.monotonic):
+        self.logger = logger
+        self.interval_ms = interval_ms
+        self.clock = clock
+        self.deadline = None  # monotonic time the next cycle should start at
+        self._expected = None  # monotonic time the running cycle should have started at
+        self._last_start = None
+        self._last_expected = None
+        self.cycles = 0
+        self.overruns = 0  # cycles that ran past the start of the next slot
+        self.skipped = 0  # slots that were skipped because of that
+        self.jitter_ms = 0.0  # exponentially weighted mean of |actual period - scheduled period|
+        self.max_jitter_ms = 0.0
+
+    def begin(self):
+        """Call at the start of each cycle, records how far its period was off"""
+        now = self.clock()
+        if self._last_start is not None and self._expected is not None:
+            jitter_ms = abs((now - self._last_start) - (self._expected - self._last_expected)) * 1000
+            self.jitter_ms = 0.9 * self.jitter_ms + 0.1 * jitter_ms
+            self.max_jitter_ms = max(self.max_jitter_ms, jitter_ms)
+        self.cycles += 1
+        self._last_start = now
+        self._last_expected = self._expected if self._expected is not None else now
+
+    def next_delay_ms(self):
+        """Time in ms until the next cycle should start, call once a cycle is done"""
+        now = self.clock()
+        interval = self.interval_ms / 1000
+        if self.deadline is None:
+            self.deadline = now + interval
+        else:
+            self.deadline += interval
+            if now >= self.deadline:
+                missed = math.floor((now - self.deadline) / interval) + 1
+                self.overruns += 1
+                self.skipped += missed
+                self.deadline += missed * interval
+                self.logger.debug(f"Poll cycle overran its slot, skipping {missed} slot(s)")
+        self._expected = self.deadline
+        return max(0, round((self.deadline - now) * 1000))
@@ -20,76 +20,367 @@ import os
 import logging_config
 from dbus.mainloop.glib import DBusGMainLoop
 import dbus
+from concurrent.futures import ThreadPoolExecutor
+from adaptive_interval import AdaptiveInterval
+from circuit_breaker import CircuitBreaker
 from connector_modbus import ModbusDataCollector2000
+from cycle_scheduler import CycleScheduler
+from metrics_server import MetricsServer
+from poller import BackgroundPoller
+from profiler import Profiler
+from publisher import DeltaPublisher
 from settings import HuaweiSUN2000Settings
+from sun2000_modbus import alarms
+from sun2000_modbus import register_map
+from sun2000_modbus.discovery import DeviceCache
+from warm_start import WarmStartSnapshot, device_key
 
 # our own packages from victron
 sys.path.insert(1, os.path.join(os.path.dirname(__file__), '/opt/victronenergy/dbus-systemcalc-py/ext/velib_python'))
 from vedbus import VeDbusService
 
+# Text snapshot of the metrics, see tools/show_metrics.py
+METRICS_SOCKET = '/run/dbus-huaweisun2000-pvinverter.metrics'
+
 
 class DbusRunServices:
-    def __init__(self, services_data, settings, logger):
+    def __init__(self, services_data, settings, logger, snapshot=None, static_pending=()):
         self.DBusServiceData = services_data
         self.settings = settings
         self.logger = logger
-        self.trials = 0
+        self.snapshot = snapshot
+        # Collectors whose static data came from the snapshot, the real thing is read before their first poll
+        self.static_pending = set(static_pending)
+        # Poll mode 1 reads it on a worker thread, the main loop mustn't wait for the device
+        self.static_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='static') if self.static_pending and self.settings.get('poll_mode') == 1 else None
+        self.static_refreshing = set()
+        self.poller = None
+        self.adaptive_interval = None
+        # SIGUSR1 profiles the driver for profile_seconds, the stats go to /data/log
+        self.profiler = Profiler(self.logger, duration=self.settings.get('profile_seconds'))
+        # Cycles start on a fixed grid, not update_time_ms after the previous one ended
+        self.scheduler = CycleScheduler(self.logger, self.settings.get('update_time_ms'))
+        self._last_sequence = None
+        # Services that share a Modbus connection are polled one after the other, different
+        # connections are polled in parallel.
+        self.groups = {}
+        for name, dbus_service in self.DBusServiceData.items():
+            self.groups.setdefault(dbus_service.get('connection'), []).append(name)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.groups), thread_name_prefix='modbus') if len(self.groups) > 1 else None
+        # One circuit breaker per connection, a device that's down is probed at a backoff instead of restarting the driver
+        self.breakers = {connection: CircuitBreaker(self.logger, f'{connection[0]}:{connection[1]}' if connection else 'inverter',
+                                                    reset_timeout=self.settings.get('backoff_in_seconds'),
+                                                    backoff_factor=self.settings.get('backoff_factor'))
+                         for connection in self.groups}
+        # Only values that moved beyond their deadband are sent, every sent value wakes up systemcalc, mqtt and the GUI
+        deadbands = self.settings.get_deadbands()
+        for dbus_service in self.DBusServiceData.values():
+            dbus_service['publisher'] = DeltaPublisher(deadbands)
 
     def run(self):
-        GLib.timeout_add(self.settings.get('update_time_ms'), self._update)  # pause in ms before the next request
+        if self.settings.get('adaptive_interval') == 1 and self.settings.get('poll_mode') != 1:
+            self.adaptive_interval = AdaptiveInterval(self.settings.get('update_time_ms'), self.settings.get('min_update_time_ms'), self.settings.get('max_update_time_ms'))
+            self.logger.info(f'Adapting the update interval between {self.adaptive_interval.min_ms} and {self.adaptive_interval.max_ms} ms')
+            with self.DBusServiceData['pvinverter']['service'] as s:
+                s['/Debug/UpdateIntervalMs'] = self.adaptive_interval.interval_ms
+        if self.settings.get('poll_mode') == 2:
+            interval = self.settings.get('poller_interval_ms') if self.adaptive_interval is None else self.adaptive_interval.interval_ms
+            self.poller = BackgroundPoller(self.logger, self._collect, interval=interval / 1000, retry_delay=self._retry_delay)
+            self.poller.start()
+            self.logger.info('Polling the inverter on a background thread')
+        if self.adaptive_interval is not None and self.poller is None:
+            self.scheduler.interval_ms = self.adaptive_interval.interval_ms
+        MetricsServer(self.logger, METRICS_SOCKET, self._metrics_snapshot).start()
+        self.profiler.install()
+        GLib.timeout_add(self.scheduler.next_delay_ms(), self._update)  # pause in ms before the next request
         self.logger.info('Connected to dbus, switching over to MainLoop and waiting for updates')
         self.logger.info('Enable DEBUG logging or use the "dbus-spy" command to inspect data updates on DBus if needed.')
         mainloop = GLib.MainLoop()
         mainloop.run()
 
     def _update(self):
-        for dbus_service in self.DBusServiceData.values():
+        self.scheduler.begin()
+        try:
+            self._cycle()
+        finally:
+            # Re-armed every time, the delay depends on how long this cycle took
+            GLib.timeout_add(self.scheduler.next_delay_ms(), self._update)
+            queued = self.DBusServiceData['pvinverter'].setdefault('queued', {})
+            queued['/Debug/CycleJitterMs'] = round(self.scheduler.jitter_ms)
+            queued['/Debug/CycleOverruns'] = self.scheduler.overruns
+        return False
+
+    def _cycle(self):
+        if self.settings.get('poll_mode') == 1:
+            self._request_updates()
+            return
+        if self.poller is not None:
+            self._publish_snapshot()
+            return
+
+        started = time.monotonic()
+        results = self._collect()
+        duration = time.monotonic() - started
+
+        for name, data_values in results.items():
+            self._publish(self.DBusServiceData[name], data_values)
+
+        if self.adaptive_interval is not None:
+            self.scheduler.interval_ms = self._adapt_interval(duration, None in results.values())
+
+    def _adapt_interval(self, duration, error):
+        """Feed one cycle into the adaptive interval controller and publish the resulting interval"""
+        old_interval_ms = self.adaptive_interval.interval_ms
+        if all(breaker.is_open for breaker in self.breakers.values()):
+            # Nothing was polled, the cycle says nothing about the link
+            return old_interval_ms
+        interval_ms = self.adaptive_interval.record(duration, error)
+        if interval_ms != old_interval_ms:
+            self.logger.debug(f"Update interval changed from {old_interval_ms} to {interval_ms} ms (cycle took {duration * 1000:.0f} ms)")
+            self.DBusServiceData['pvinverter'].setdefault('queued', {})['/Debug/UpdateIntervalMs'] = interval_ms
+        return interval_ms
+
+    def _retry_delay(self):
+        """Time until the first of the open circuit breakers lets a probe through, 0 if one of them is closed"""
+        return min(breaker.retry_in() for breaker in self.breakers.values())
+
+    def _collect(self):
+        """Run one poll cycle for all services, returns a dict service name -> data"""
+        if self.executor is None:
+            # On the poller thread in poll mode 2
+            return self.profiler.call(self._collect_group, next(iter(self.groups.values())))
+        results = {}
+        for future in [self.executor.submit(self.profiler.call, self._collect_group, names) for names in self.groups.values()]:
+            results.update(future.result())
+        return results
+
+    def _collect_group(self, names):
+        """Poll the services of one connection, services without data map to None"""
+        breaker = self.breakers[self.DBusServiceData[names[0]].get('connection')]
+        if not breaker.allow():
+            return {name: None for name in names}
+        collectors = []
+        for name in names:
+            if self.DBusServiceData[name]['collector'] not in collectors:
+                collectors.append(self.DBusServiceData[name]['collector'])
+        if breaker.is_probing:
+            # The breaker waited long enough, the collectors' own reconnect backoff mustn't turn the probe down unseen
+            for collector in collectors:
+                collector.resetBackoff()
+        try:
+            for collector in collectors:
+                if collector in self.static_pending:
+                    self._refresh_static(collector)
+            for collector in collectors:
+                collector.beginCycle()
+            started = time.monotonic()
             try:
-                data_collector = dbus_service['data']  # get the data collector function
-                data_values = data_collector()  # call the data collector function to get the latest data
-            except Exception as e:
-                self.logger.critical("Data collector exception: " + str(e))
-                sys.exit(0)  # Exit to force service restart...
-
-            if data_values is None:
-                self.logger.critical("TCP connection is probably lost. No data received. Retrying...")
-                self.trials += 1
-                if self.trials >= 5:
-                    sys.exit(0)  # Exit to force service restart...
-            else:
-                self.trials = 0
-                with dbus_service['service'] as s:  # get the dbus service object
-                    try:
-                        # Preserve previous status so we can log changes later
-                        try:
-                            old_status = s['/Status']
-                            if old_status == '' or old_status is None:
-                                old_status = 'unknown'
-                        except KeyError:
-                            old_status = None
-
-                        # Update all the values in the dbus service with the ones we got from the inverter
-                        for k, v in data_values.items():
-                            self.logger.debug(f"Set {k} to {v}")
-                            s[k] = v
-
-                        # Log the status changes of the device, which shouldn't be too many and
-                        # sometimes it's of value for the user to know.
-                        if old_status is not None and s['/Status'] != old_status:
-                            if s['/Status'] == '' or s['/Status'] is None:
-                                s['/Status'] = 'unknown'
-                            self.logger.info(f'Device status changed from {old_status} to {s["/Status"]}')
-
-                        # increment UpdateIndex - to show that new data is available (and wrap)
-                        s['/UpdateIndex'] = (s['/UpdateIndex'] + 1) % 256
-
-                        # update lastupdate vars
-                        self._lastUpdate = time.time()
+                results = {name: self.DBusServiceData[name]['data']() for name in names}
+            finally:
+                for collector in collectors:
+                    collector.endCycle()
+                # The collectors of a group share the connection and with it the metrics
+                collectors[0].metrics.observe('cycle', time.monotonic() - started)
+        except Exception as e:
+            self.logger.error("Data collector exception: " + str(e))
+            results = {name: None for name in names}
+        if None in results.values():
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return results
+
+    def _refresh_static(self, collector):
+        """Warm start: read the static data the services were registered with from the snapshot, on an executor or the poller thread"""
+        data = collector.getStaticData()
+        self._check_static(collector, data)
+        # The snapshot is saved from the main loop, only touch it there
+        GLib.idle_add(self._store_static, collector, data)
+
+    def _refresh_static_async(self, connection, collector):
+        """Non-blocking poll mode: read the static data on a worker thread, the result is applied in the main loop"""
+        if collector in self.static_refreshing:
+            return
+        self.static_refreshing.add(collector)
+        future = self.static_executor.submit(collector.getStaticData)
+        future.add_done_callback(lambda future: GLib.idle_add(self._on_static, connection, collector, future))
+
+    def _on_static(self, connection, collector, future):
+        self.static_refreshing.discard(collector)
+        try:
+            data = future.result()
+            self._check_static(collector, data)
+        except Exception as e:
+            self.logger.error("Data collector exception: " + str(e))
+            self.breakers[connection].record_failure()
+            return False
+        return self._store_static(collector, data)
+
+    def _check_static(self, collector, data):
+        if data is None:
+            raise ValueError(f"Didn't receive static data from {device_key(collector)}")
+        self.static_pending.discard(collector)
+
+    def _store_static(self, collector, data):
+        """Main loop: put the static data read from the device into the snapshot"""
+        old = self.snapshot.devices.get(device_key(collector), {})
+        if old.get('SN') != data['SN']:
+            self.logger.warning(f"Device {device_key(collector)} changed from SN {old.get('SN')} to {data['SN']}, restart the driver to update its dbus service")
+        self.snapshot.devices[device_key(collector)] = data
+        return False
+
+    def _request_updates(self):
+        """Non-blocking poll mode: kick off the requests, the results are published from the main loop once they arrive"""
+        started = []
+        for connection, names in self.groups.items():
+            if not self.breakers[connection].allow():
+                continue
+            for name in names:
+                dbus_service = self.DBusServiceData[name]
+                if dbus_service.get('pending'):
+                    # The previous request hasn't finished yet, don't stack them up
+                    continue
+                if dbus_service['collector'] not in started:
+                    if self.breakers[connection].is_probing:
+                        dbus_service['collector'].resetBackoff()
+                    if dbus_service['collector'] in self.static_pending:
+                        # The services of this connection are polled once the static data is in
+                        self._refresh_static_async(connection, dbus_service['collector'])
+                        break
+                    dbus_service['collector'].beginCycle()
+                    started.append(dbus_service['collector'])
+                dbus_service['pending'] = True
+                try:
+                    dbus_service['request'](lambda data_values, dbus_service=dbus_service: self._on_data(dbus_service, data_values))
+                except Exception as e:
+                    self.logger.error("Data collector exception: " + str(e))
+                    self._on_data(dbus_service, None)
+
+    def _publish_snapshot(self):
+        """Background poll mode: publish the latest snapshot of the poller thread, if there is a new one"""
+        snapshot = self.poller.latest()
+        if snapshot is None or snapshot['sequence'] == self._last_sequence:
+            return
+        self._last_sequence = snapshot['sequence']
+        if snapshot['data'] is None:
+            self.logger.error("Data collector exception: " + str(snapshot['error']))
+            return
+        for name, data_values in snapshot['data'].items():
+            self._publish(self.DBusServiceData[name], data_values)
+        if self.adaptive_interval is not None:
+            self.poller.interval = self._adapt_interval(snapshot['duration'], None in snapshot['data'].values()) / 1000
+
+    def _on_data(self, dbus_service, data_values):
+        dbus_service['pending'] = False
+        breaker = self.breakers[dbus_service.get('connection')]
+        if data_values is None:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        self._publish(dbus_service, data_values)
+
+    def _publish(self, dbus_service, data_values):
+        """Write what changed in this cycle to the dbus service in one go, velib sends it as a single ItemsChanged signal"""
+        # While the breaker is open the service stays registered with its last values, but marked as disconnected
+        connected = 0 if self.breakers[dbus_service.get('connection')].is_open else 1
+        if data_values is None:
+            if connected:
+                self.logger.warning("TCP connection is probably lost. No data received. Retrying...")
+            # The values stay on dbus, their age tells consumers how old they are by now
+            with dbus_service['service'] as s:
+                if s['/Connected'] != connected:
+                    s['/Connected'] = connected
+                s['/Debug/DataAgeMs'] = self._data_age_ms(dbus_service)
+            return
+
+        # When the Modbus reads behind the values happened, e.g. slow registers are only read every minute
+        read_times = getattr(data_values, 'read_times', {})
+        dbus_service.setdefault('read_times', {}).update(read_times)
+        rtt = dbus_service['collector'].rtt
+        data_values = dict(data_values)
+        stamps = [t for t in read_times.values() if t is not None]
+        if stamps:
+            # From the most recent read of this cycle to now, when the values are sent
+            data_values['/Latency'] = round((time.monotonic() - max(stamps)) * 1000)
+        data_values['/Debug/DataAgeMs'] = self._data_age_ms(dbus_service)
+        if rtt.srtt is not None:
+            data_values['/Debug/ModbusRttMs'] = round(rtt.srtt * 1000)
+        data_values['/Debug/ModbusTimeoutMs'] = round(rtt.timeout * 1000)
+        data_values = dbus_service['publisher'].changes(data_values)
+        # Values set outside of a poll cycle, e.g. by the adaptive interval, go out with this batch
+        data_values.update(dbus_service.pop('queued', {}))
+        # Counters aren't subject to the deadbands, they'd look stuck
+        data_values.update(self._metrics_values(dbus_service['collector'].metrics))
+        if self.snapshot is not None:
+            self.snapshot.update(dbus_service['name'], data_values)
+        with dbus_service['service'] as s:  # get the dbus service object
+            try:
+                if s['/Connected'] != connected:
+                    s['/Connected'] = connected
+                if s['/Stale']:
+                    s['/Stale'] = 0
+                # Preserve previous status so we can log changes later
+                try:
+                    old_status = s['/Status']
+                    if old_status == '' or old_status is None:
+                        old_status = 'unknown'
+                except KeyError:
+                    old_status = None
+
+                # Update the values in the dbus service that changed noticeably since they were last sent
+                for k, v in data_values.items():
+                    self.logger.debug(f"Set {k} to {v}")
+                    s[k] = v
+
+                # Log the status changes of the device, which shouldn't be too many and
+                # sometimes it's of value for the user to know.
+                if old_status is not None and s['/Status'] != old_status:
+                    if s['/Status'] == '' or s['/Status'] is None:
+                        s['/Status'] = 'unknown'
+                    self.logger.info(f'Device status changed from {old_status} to {s["/Status"]}')
+
+                # increment UpdateIndex - to show that new data is available (and wrap)
+                s['/UpdateIndex'] = (s['/UpdateIndex'] + 1) % 256
 
-                    except Exception as e:
-                        self.logger.critical('Error at %s', '_update', exc_info=e)
+            except Exception as e:
+                self.logger.critical('Error at %s', '_update', exc_info=e)
+
+    @staticmethod
+    def _metrics_values(metrics):
+        """The /Debug paths of the metrics of a connection"""
+        counters = metrics.counters
+        request_ms = metrics.percentile_ms('request', 95)
+        decode_ms = metrics.mean_ms('decode')
+        cycle_ms = metrics.percentile_ms('cycle', 95)
+        return {
+            '/Debug/ModbusRequests': counters['requests'],
+            '/Debug/ModbusErrors': counters['errors'],
+            '/Debug/ModbusRetries': counters['retries'],
+            '/Debug/ModbusReconnects': counters['reconnects'],
+            '/Debug/ModbusBytes': counters['bytes_sent'] + counters['bytes_received'],
+            '/Debug/ModbusRequestP95Ms': round(request_ms) if request_ms is not None else None,
+            '/Debug/DecodeUs': round(decode_ms * 1000) if decode_ms is not None else None,
+            '/Debug/CycleP95Ms': round(cycle_ms) if cycle_ms is not None else None,
+        }
+
+    def _metrics_snapshot(self):
+        """Text snapshot of the metrics of all connections and the scheduler"""
+        scheduler = self.scheduler
+        lines = [f"[scheduler]\ninterval_ms {scheduler.interval_ms}\ncycles {scheduler.cycles}\noverruns {scheduler.overruns}\nskipped {scheduler.skipped}\n"
+                 f"jitter_ms {scheduler.jitter_ms:.1f}\nmax_jitter_ms {scheduler.max_jitter_ms:.1f}\n"]
+        collectors = {}
+        for dbus_service in self.DBusServiceData.values():
+            collectors.setdefault(id(dbus_service['collector'].metrics), dbus_service['collector'])
+        for collector in collectors.values():
+            srtt = f"{collector.rtt.srtt * 1000:.1f}" if collector.rtt.srtt is not None else "-"
+            lines.append(collector.metrics.format() + f"srtt_ms {srtt}\ntimeout_ms {collector.rtt.timeout * 1000:.0f}\n")
+        return '\n'.join(lines)
 
-        return True
+    @staticmethod
+    def _data_age_ms(dbus_service):
+        """Time since the most recent Modbus read behind the values of a service, None before the first one"""
+        read_times = [t for t in dbus_service.get('read_times', {}).values() if t is not None]
+        return round((time.monotonic() - max(read_times)) * 1000) if read_times else None
 
 
 class SystemBus(dbus.bus.BusConnection):
@@ -124,7 +415,7 @@ def get_version(logger):
         return '0.1'
 
 
-def NewService(servicename, settings, logger, paths, devicedata, role='pvinverter'):
+def NewService(servicename, settings, logger, paths, devicedata, role='pvinverter', instance=None, custom_name=None):
 
     serialnumber = devicedata['SN']
     productname = devicedata['Model']
@@ -138,21 +429,26 @@ def NewService(servicename, settings, logger, paths, devicedata, role='pvinverte
     _dbusservice.add_path('/Mgmt/Connection', 'Modbus TCP')
 
     # Create the mandatory objects
-    if role == 'pvinverter':
-        instance = settings.get_vrm_instance()
-    else:
-        instance = settings.get_vrm_instance() + 1
+    if instance is None:
+        if role == 'pvinverter':
+            instance = settings.get_vrm_instance()
+        else:
+            instance = settings.get_vrm_instance() + 1
 
     _dbusservice.add_path('/DeviceInstance', instance)
     _dbusservice.add_path('/ProductId', 0xFFFF)  # Unknown product
     _dbusservice.add_path('/ProductName', productname)
-    if settings.get("custom_name") not in ["none", ""]:
+    if custom_name is not None:
+        _dbusservice.add_path('/CustomName', custom_name)
+    elif settings.get("custom_name") not in ["none", ""]:
         _dbusservice.add_path('/CustomName', settings.get("custom_name"))
     else:
         _dbusservice.add_path('/CustomName', productname)
     _dbusservice.add_path('/FirmwareVersion', get_version(logger))
     _dbusservice.add_path('/HardwareVersion', 0)
     _dbusservice.add_path('/Connected', 1, writeable=True)
+    # 1 while the values are the ones restored from the warm start snapshot
+    _dbusservice.add_path('/Stale', 0)
 
     # Create the mandatory objects
     _dbusservice.add_path('/Latency', None)
@@ -162,6 +458,17 @@ def NewService(servicename, settings, logger, paths, devicedata, role='pvinverte
     _dbusservice.add_path('/ErrorCode', 0)
     _dbusservice.add_path('/UpdateIndex', 0)
     _dbusservice.add_path('/StatusCode', 7)  # 0 = Startup, 7 = Running, 8 = Standby, 9 = Bootloading, 10 = Error
+    # Measured Modbus round trip time of the connection and the request timeout derived from it
+    _dbusservice.add_path('/Debug/ModbusRttMs', None)
+    _dbusservice.add_path('/Debug/ModbusTimeoutMs', None)
+    # Time since the most recent Modbus read behind the values, grows while the device doesn't answer
+    _dbusservice.add_path('/Debug/DataAgeMs', None)
+    # Metrics of the Modbus connection since the start, tools/show_metrics.py shows all of them
+    for path in ('/Debug/ModbusRequests', '/Debug/ModbusErrors', '/Debug/ModbusRetries', '/Debug/ModbusReconnects', '/Debug/ModbusBytes'):
+        _dbusservice.add_path(path, 0)
+    _dbusservice.add_path('/Debug/ModbusRequestP95Ms', None)
+    _dbusservice.add_path('/Debug/DecodeUs', None)
+    _dbusservice.add_path('/Debug/CycleP95Ms', None)
 
     for _path, _settings in paths.items():
         _dbusservice.add_path(
@@ -175,6 +482,32 @@ def NewService(servicename, settings, logger, paths, devicedata, role='pvinverte
     return _dbusservice
 
 
+def create_collector(settings, logger, host, port, modbus_unit, shared=None, device_cache=None):
+    """Create a data collector, shared is an existing collector whose connection should be reused"""
+    return ModbusDataCollector2000(logger=logger,
+                                   modbus_version=settings.get("modbus_version").strip().upper(),
+                                   host=host,
+                                   port=port,
+                                   modbus_unit=modbus_unit,
+                                   pcf_override=settings.get("pcf_override"),
+                                   system_type=settings.get("system_type"),
+                                   max_retries=settings.get("max_retries"),
+                                   backoff_in_seconds=settings.get("backoff_in_seconds"),
+                                   backoff_factor=settings.get("backoff_factor"),
+                                   max_gap=settings.get("read_gap_fill"),
+                                   slow_poll_interval=settings.get("slow_poll_interval"),
+                                   async_mode=settings.get("poll_mode") == 1,
+                                   burst_mode=settings.get("burst_mode") == 1,
+                                   pipeline_window=settings.get("pipeline_window"),
+                                   min_timeout=settings.get("min_timeout_ms") / 1000,
+                                   max_timeout=settings.get("max_timeout_ms") / 1000,
+                                   client=shared.invSun2000.inverter if shared is not None else None,
+                                   async_client=shared.async_client if shared is not None else None,
+                                   rtt=shared.rtt if shared is not None else None,
+                                   metrics=shared.metrics if shared is not None else None,
+                                   device_cache=device_cache)
+
+
 def exit_mainloop(mainloop):
     mainloop.quit()
 
@@ -192,12 +525,19 @@ def main():
     DBusGMainLoop(set_as_default=True)
 
     settings = HuaweiSUN2000Settings(logger)
+    # Additional or corrected registers for models that differ from the built-in register maps
+    custom_registers = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'custom_registers.csv')
+    if os.path.exists(custom_registers):
+        logger.info(f"Loading registers from {custom_registers}")
+        register_map.add_data_file(custom_registers)
     logger.info(f"VRM pvinverter instance: {settings.get_vrm_instance()}")
     logger.info(f"Settings: ModbusVersion '{settings.get('modbus_version')}', ModbusHost '{settings.get('modbus_host')}'")
     logger.info(f"Settings: ModbusPort '{settings.get('modbus_port')}', ModbusUnit '{settings.get('modbus_unit')}'")
     logger.info(f"Settings: CustomName '{settings.get('custom_name')}', Position '{settings.get('position')}'")
     logger.info(f"Settings: UpdateTimeMS '{settings.get('update_time_ms')}', PCFOverride '{settings.get('pcf_override')}'")
-    logger.info(f"Settings: SystemType '{settings.get('system_type')}'")
+    logger.info(f"Settings: SystemType '{settings.get('system_type')}', PollMode '{settings.get('poll_mode')}'")
+    logger.info(f"Settings: AdaptiveInterval '{settings.get('adaptive_interval')}', MinUpdateTimeMS '{settings.get('min_update_time_ms')}', MaxUpdateTimeMS '{settings.get('max_update_time_ms')}'")
+    logger.info(f"Settings: ExtraDevices '{settings.get('extra_devices')}'")
 
     while "255" in settings.get("modbus_host"):
         # This catches the initial setting and allows the service to be installed without configuring it first
@@ -206,18 +546,28 @@ def main():
         mainloop = GLib.MainLoop()
         mainloop.run()
 
-    modbus = ModbusDataCollector2000(logger=logger,
-                                     modbus_version=settings.get("modbus_version").strip().upper(),
-                                     host=settings.get("modbus_host"),
-                                     port=settings.get("modbus_port"),
-                                     modbus_unit=settings.get("modbus_unit"),
-                                     pcf_override=settings.get("pcf_override"),
-                                     system_type=settings.get("system_type"),
-                                     max_retries=settings.get("max_retries"),
-                                     backoff_in_seconds=settings.get("backoff_in_seconds"),
-                                     backoff_factor=settings.get("backoff_factor"))
+    # Lives next to the driver in /data, so it survives firmware updates
+    device_cache = DeviceCache(logger, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'device_cache.json'))
+    modbus = create_collector(settings, logger, settings.get("modbus_host"), settings.get("modbus_port"), settings.get("modbus_unit"), device_cache=device_cache)
+    # One collector per additional inverter, units behind the same host:port share the connection
+    connections = {(settings.get("modbus_host"), settings.get("modbus_port")): modbus}
+    extra_collectors = []
+    for device in settings.get_extra_devices():
+        key = (device['host'], device['port'])
+        extra_collectors.append(create_collector(settings, logger, device['host'], device['port'], device['unit'], shared=connections.get(key), device_cache=device_cache))
+        connections.setdefault(key, extra_collectors[-1])
+
+    # Static data and last values of the previous run, they let us register the dbus services without waiting for the inverter
+    snapshot = WarmStartSnapshot(logger, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshot.json'))
+    snapshot.load()
+    static_pending = []
 
     while True:
+        staticdata = snapshot.devices.get(device_key(modbus))
+        if staticdata is not None:
+            logger.info("Static device data from the snapshot: " + str(staticdata))
+            static_pending.append(modbus)
+            break
         staticdata = modbus.getStaticData()
         if staticdata is None:
             logger.error("Didn't receive static data from modbus, error is above. Sleeping 10 seconds before retrying.")
@@ -228,8 +578,27 @@ def main():
             continue
         else:
             logger.info("Static device data: " + str(staticdata))
+            snapshot.devices[device_key(modbus)] = staticdata
             break
 
+    # Additional inverters are optional, one that doesn't answer at startup mustn't keep the others from starting
+    extra_staticdata = []
+    for extra in extra_collectors:
+        data = snapshot.devices.get(device_key(extra))
+        if data is not None:
+            static_pending.append(extra)
+            extra_staticdata.append(data)
+            continue
+        data = extra.getStaticData()
+        if data is None:
+            logger.warning(f"Didn't receive static data from {extra.invSun2000.inverter.host} unit {extra.modbus_unit}, starting without it")
+            data = {'SN': 'unknown', 'Model': 'unknown', 'ModelID': 0, 'NumberOfPVStrings': 0, 'NumberOfMPPTrackers': 0}
+        else:
+            logger.info(f"Static device data ({extra.invSun2000.inverter.host} unit {extra.modbus_unit}): {data}")
+            snapshot.devices[device_key(extra)] = data
+        extra_staticdata.append(data)
+    snapshot.save()
+
     try:
         logger.info("Starting up")
 
@@ -321,15 +690,46 @@ def main():
                 '/Ac/L1/Power': {'initial': 0, 'textformat': _w},
             }
 
+        def inverter_paths(devicedata):
+            """The inverter paths plus voltage, current and power of each PV string and the alarms"""
+            paths = dict(dbuspath_inv)
+            for n in range(1, int(devicedata['NumberOfPVStrings']) + 1):
+                paths[f'/Pv/{n}/V'] = {'initial': None, 'textformat': _v}
+                paths[f'/Pv/{n}/I'] = {'initial': None, 'textformat': _a}
+                paths[f'/Pv/{n}/P'] = {'initial': None, 'textformat': _w}
+            # 0 = ok, 1 = warning, 2 = alarm
+            for path in alarms.paths():
+                paths[path] = {'initial': 0}
+            return paths
+
         DbusServices = {}
 
         inverter_service = NewService(servicename='com.victronenergy.pvinverter.sun2000',
                                       settings=settings,
                                       logger=logger,
-                                      paths=dbuspath_inv,
+                                      paths=inverter_paths(staticdata),
                                       devicedata=staticdata,
                                       role='pvinverter')
-        DbusServices['pvinverter'] = {'service': inverter_service, 'data': modbus.getInverterData}
+        # Effective time between two poll cycles, only changes when AdaptiveInterval is enabled
+        inverter_service.add_path('/Debug/UpdateIntervalMs', settings.get('update_time_ms'))
+        # Mean deviation of the cycle period from the interval and the number of cycles that overran their slot
+        inverter_service.add_path('/Debug/CycleJitterMs', None)
+        inverter_service.add_path('/Debug/CycleOverruns', 0)
+        DbusServices['pvinverter'] = {'service': inverter_service, 'collector': modbus, 'connection': modbus.connection,
+                                      'data': modbus.getInverterData, 'request': modbus.requestInverterData}
+
+        for index, (extra, data) in enumerate(zip(extra_collectors, extra_staticdata), start=1):
+            extra_service = NewService(servicename=f'com.victronenergy.pvinverter.sun2000_{index}',
+                                       settings=settings,
+                                       logger=logger,
+                                       paths=inverter_paths(data),
+                                       devicedata=data,
+                                       role='pvinverter',
+                                       # The first inverter uses the configured instance, the meter the next one
+                                       instance=settings.get_vrm_instance() + 1 + index,
+                                       custom_name=data['Model'])
+            DbusServices[f'pvinverter_{index}'] = {'service': extra_service, 'collector': extra, 'connection': extra.connection,
+                                                   'data': extra.getInverterData, 'request': extra.requestInverterData}
 
         meter_service_grid = NewService(servicename='com.victronenergy.grid.ddsu666h',
                                         settings=settings,
@@ -347,19 +747,35 @@ def main():
 
         usemeter = settings.get("use_meter")
         if usemeter == 1:
-            DbusServices['meter'] = {'service': meter_service_grid, 'data': modbus.getMeterData}
+            DbusServices['meter'] = {'service': meter_service_grid, 'collector': modbus, 'connection': modbus.connection,
+                                     'data': modbus.getMeterData, 'request': modbus.requestMeterData}
         elif usemeter == 2:
-            DbusServices['meter'] = {'service': meter_service_acload, 'data': modbus.getMeterData}
+            DbusServices['meter'] = {'service': meter_service_acload, 'collector': modbus, 'connection': modbus.connection,
+                                     'data': modbus.getMeterData, 'request': modbus.requestMeterData}
         else:
             logger.info('No meter service created, as use_meter is set to %s', usemeter)
 
-        for dbus_service in DbusServices.values():
+        for name, dbus_service in DbusServices.items():
+            dbus_service['name'] = name
             dbus_service['service'].register()
+            # Show the last known values until the first poll comes in
+            values = snapshot.services.get(name)
+            if values and dbus_service['collector'] in static_pending:
+                with dbus_service['service'] as s:
+                    for k, v in values.items():
+                        try:
+                            s[k] = v
+                        except KeyError:
+                            pass  # the paths depend on the settings, which may have changed since
+                    s['/Stale'] = 1
+                logger.info(f"Restored the values of {name} from the snapshot")
 
         run_services = DbusRunServices(
             services_data=DbusServices,
             settings=settings,
-            logger=logger
+            logger=logger,
+            snapshot=snapshot,
+            static_pending=static_pending
         )
         run_services.run()
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import os
+import socket
+
+from gi.repository import GLib
+
+
+class MetricsServer:
+    """Serves a text snapshot of the metrics on a Unix socket, each client gets one snapshot and is disconnected.
+
+    Runs in the GLib main loop, read it with tools/show_metrics.py.
+    """
+
+    def __init__(self, logger, path, snapshot):
+        self.logger = logger
+        self.path = path
+        self.snapshot = snapshot  # returns the text to send
+        self.socket = None
+
+    def start(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        try:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.bind(self.path)
+            self.socket.listen(4)
+            self.socket.setblocking(False)
+        except OSError as e:
+            self.logger.warning(f"Couldn't serve the metrics on {self.path}: {e}")
+            self.socket = None
+            return
+        GLib.io_add_watch(self.socket.fileno(), GLib.IO_IN, self._on_connect)
+
+    def _on_connect(self, fd, condition):
+        try:
+            connection, _ = self.socket.accept()
+        except BlockingIOError:
+            return True
+        with connection:
+            try:
+                # A snapshot is a few KB, it fits into the socket buffer
+                connection.settimeout(1)
+                connection.sendall(self.snapshot().encode())
+            except OSError as e:
+                self.logger.debug(f"Couldn't send the metrics: {e}")
+        return True
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import threading
+import time
+
+# Shortest time between the start of two cycles in seconds. A cycle that fails right away (connect
+# backoff, open circuit breaker) would otherwise make the thread spin and pin a core of the GX.
+MIN_INTERVAL = 0.25
+
+
+class BackgroundPoller(threading.Thread):
+    """Runs the blocking data collectors on a worker thread.
+
+    Every poll cycle produces a complete, timestamped snapshot that is written into the back
+    buffer, then the buffers are swapped. The GLib main loop only ever picks up the front buffer
+    through latest(), so it never waits for the inverter.
+    """
+
+    def __init__(self, logger, collect, interval=0, retry_delay=None):
+        super().__init__(name='modbus-poller', daemon=True)
+        self.logger = logger
+        self.collect = collect  # runs one poll cycle, returns a dict service name -> data
+        self.interval = interval  # minimum time between the start of two cycles in seconds, 0 = as fast as MIN_INTERVAL allows
+        # Returns the time in seconds until a failed cycle is worth repeating, e.g. until the circuit breaker lets the next probe through
+        self.retry_delay = retry_delay
+        self._buffers = [None, None]
+        self._front = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        sequence = 0
+        while not self._stop_event.is_set():
+            started = time.monotonic()
+            try:
+                data, error = self.collect(), None
+            except Exception as e:
+                data, error = None, e
+            sequence += 1
+
+            back = 1 - self._front
+            self._buffers[back] = {'sequence': sequence, 'timestamp': time.monotonic(), 'duration': time.monotonic() - started, 'data': data, 'error': error}
+            with self._lock:
+                self._front = back
+
+            delay = max(self.interval, MIN_INTERVAL) - (time.monotonic() - started)
+            if self.retry_delay is not None and (data is None or None in data.values()):
+                delay = max(delay, self.retry_delay())
+            self._stop_event.wait(max(0.0, delay))
+
+    def latest(self):
+        """Return the most recent complete snapshot, None if there is none yet"""
+        with self._lock:
+            return self._buffers[self._front]
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import cProfile
+import io
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+from gi.repository import GLib
+
+# Since Python 3.12 cProfile sits on sys.monitoring, which is process wide: one enabled profile sees all threads,
+# and enabling a second one raises "ValueError: Another profiling tool is already active"
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    """Profiles the running driver for a while once it receives SIGUSR1, e.g. `svc -1 /service/dbus-huaweisun2000-pvinverter`.
+
+    The main thread is profiled as a whole, the poll cycles that run on other threads (poll mode 2, several
+    connections) through call(); with Python 3.12 and later the main thread's profile covers them already.
+    The stats end up in directory, as .prof file for tools like snakeviz and as text summary. Until the
+    signal arrives, the only cost is the check in call().
+    """
+
+    def __init__(self, logger, directory='/data/log', duration=60):
+        self.logger = logger
+        self.directory = directory
+        self.duration = duration
+        self.active = False
+        self._profile = None
+        self._thread = None
+        self._thread_stats = []  # profiles of the other threads, merged when done
+        self._lock = threading.Lock()
+
+    def install(self):
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self._start)
+
+    def call(self, function, *args):
+        """Run function(*args), profiled if profiling is active and this isn't the main thread (which is profiled anyway)"""
+        if not self.active or PROFILES_ALL_THREADS or threading.get_ident() == self._thread:
+            return function(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Some other profiler is active, the poll cycle must run anyway
+            return function(*args)
+        try:
+            return function(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._thread_stats.append(profile)
+
+    def _start(self):
+        if self.active:
+            self.logger.info("Already profiling")
+            return True
+        self.logger.info(f"Profiling for {self.duration} seconds")
+        self._thread_stats = []
+        self._thread = threading.get_ident()
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            self.logger.error(f"Couldn't start profiling: {e}")
+            return True
+        self.active = True
+        GLib.timeout_add_seconds(self.duration, self._stop)
+        return True  # keep the signal handler
+
+    def _stop(self):
+        self._profile.disable()
+        self.active = False
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_stats:
+                stats.add(profile)
+            self._thread_stats = []
+        path = os.path.join(self.directory, time.strftime('dbus-huaweisun2000-pvinverter-%Y%m%d-%H%M%S'))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            stats.dump_stats(path + '.prof')
+            summary = io.StringIO()
+            pstats.Stats(path + '.prof', stream=summary).sort_stats('cumulative').print_stats(40)
+            with open(path + '.txt', 'w') as f:
+                f.write(summary.getvalue())
+            self.logger.info(f"Profile written to {path}.prof and {path}.txt")
+        except OSError as e:
+            self.logger.error(f"Couldn't write the profile: {e}")
+        return False
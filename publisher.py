@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+from fnmatch import fnmatchcase
+
+
+class DeltaPublisher:
+    """Decides which values of a dbus service are worth sending, based on the last value sent per path.
+
+    deadbands is a list of (path pattern, absolute, relative) tuples, the first pattern (fnmatch style)
+    matching a path applies. A numeric value is only sent once it moved by more than the absolute
+    amount or the relative fraction of the last sent value, whichever is larger. Other values are
+    sent when they differ, so are numeric values without a deadband and a value that drops to 0.
+    """
+
+    def __init__(self, deadbands=()):
+        self.deadbands = list(deadbands)
+        self.sent = {}  # dbus path -> last value sent
+        self._bands = {}  # dbus path -> (absolute, relative) or None, the pattern lookup is done once per path
+
+    def _band(self, path):
+        if path not in self._bands:
+            self._bands[path] = next(((absolute, relative) for pattern, absolute, relative in self.deadbands if fnmatchcase(path, pattern)), None)
+        return self._bands[path]
+
+    def changes(self, values):
+        """Return the part of values (dbus path -> value) that should be sent and remember it as sent"""
+        changes = {}
+        for path, value in values.items():
+            if path in self.sent:
+                last = self.sent[path]
+                if value == last:
+                    continue
+                band = self._band(path)
+                if band is not None and value and isinstance(value, (int, float)) and isinstance(last, (int, float)) and not isinstance(value, bool):
+                    absolute, relative = band
+                    if abs(value - last) <= max(absolute, relative * abs(last)):
+                        continue
+            changes[path] = value
+            self.sent[path] = value
+        return changes
+
+    def forget(self):
+        """Send everything again next time, e.g. after the values on dbus were overwritten"""
+        self.sent.clear()
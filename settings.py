@@ -10,6 +10,24 @@ sys.path.insert(1, os.path.join(os.path.dirname(__file__), '/opt/victronenergy/d
 from settingsdevice import SettingsDevice
 
 
+# 1 W, 0.01 Hz, 0.1 V, 0.01 A and 10 % of the latency and the debug values
+DEFAULT_DEADBANDS = "*/Power:1, */P:1, */Frequency:0.01, */Voltage:0.1, */V:0.1, */Current:0.01, */I:0.01, /Latency:0:0.1, /Debug/*:0:0.1"
+
+
+def parse_deadbands(value, logger):
+    """Parse a deadbands setting into a list of (path pattern, absolute, relative) tuples"""
+    deadbands = []
+    for entry in value.split(","):
+        parts = entry.strip().split(":")
+        if not parts[0]:
+            continue
+        try:
+            deadbands.append((parts[0], float(parts[1]) if len(parts) > 1 and parts[1] else 0.0, float(parts[2]) if len(parts) > 2 and parts[2] else 0.0))
+        except ValueError:
+            logger.error(f"Ignoring invalid entry '{entry.strip()}' in Deadbands, expected path:absolute[:relative]")
+    return deadbands
+
+
 class SystemBus(dbus.bus.BusConnection):
     def __new__(cls):
         return dbus.bus.BusConnection.__new__(cls, dbus.bus.BusConnection.TYPE_SYSTEM)
@@ -42,6 +60,37 @@ class HuaweiSUN2000Settings(object):
             "max_retries": ["/Settings/HuaweiSUN2000/MaxRetries", 3, 0, 100, 0],
             "backoff_in_seconds": ["/Settings/HuaweiSUN2000/BackoffInSeconds", 1, 0, 100, 0],
             "backoff_factor": ["/Settings/HuaweiSUN2000/BackoffFactor", 2.0, 1.0, 10.0, 0],
+            # Max. number of unused registers read in between two wanted ones to save a request
+            "read_gap_fill": ["/Settings/HuaweiSUN2000/ReadGapFill", 8, 0, 100, 0],
+            # Interval in seconds for registers that change rarely (energy counters, max. power)
+            "slow_poll_interval": ["/Settings/HuaweiSUN2000/SlowPollInterval", 60, 1, 3600, 0],
+            # 0 = blocking Modbus requests, 1 = non-blocking requests handled by the GLib main loop,
+            # 2 = blocking requests on a background thread, the main loop only publishes the results
+            "poll_mode": ["/Settings/HuaweiSUN2000/PollMode", 0, 0, 2, 0],
+            # Poll mode 2 only: minimum time between two poll cycles, 0 = as fast as the link allows (at most 4 cycles per second)
+            "poller_interval_ms": ["/Settings/HuaweiSUN2000/PollerIntervalMS", 0, 0, 10000000, 0],
+            # 1 = open the connection for each poll cycle and close it right afterwards (poll modes 0 and 2).
+            # Some SDongles reboot or stop uploading to FusionSolar if the connection is kept open.
+            "burst_mode": ["/Settings/HuaweiSUN2000/BurstMode", 0, 0, 1, 0],
+            # Further inverters to poll, comma separated "host[:port[:unit]]" entries, e.g. "192.168.1.20:502:1, 192.168.1.21".
+            # Port and unit default to ModbusPort and ModbusUnit. All other settings are shared with the first inverter.
+            "extra_devices": ["/Settings/HuaweiSUN2000/ExtraDevices", "", "", "", 0],
+            # Number of Modbus requests in flight at the same time on one connection. Only raise this for
+            # gateways that handle several outstanding transactions (SmartLogger, EMMA), not for SDongles.
+            "pipeline_window": ["/Settings/HuaweiSUN2000/PipelineWindow", 1, 1, 16, 0],
+            # 1 = adapt the update interval to the measured Modbus cycle time and error rate (poll modes 0 and 2),
+            # UpdateTimeMS is the starting point and the interval is kept between the two limits below
+            "adaptive_interval": ["/Settings/HuaweiSUN2000/AdaptiveInterval", 0, 0, 1, 0],
+            "min_update_time_ms": ["/Settings/HuaweiSUN2000/MinUpdateTimeMS", 250, 100, 10000000, 0],
+            "max_update_time_ms": ["/Settings/HuaweiSUN2000/MaxUpdateTimeMS", 10000, 100, 10000000, 0],
+            # Modbus requests time out after 4x the measured round trip time, but no earlier/later than this
+            "min_timeout_ms": ["/Settings/HuaweiSUN2000/MinTimeoutMS", 300, 50, 60000, 0],
+            "max_timeout_ms": ["/Settings/HuaweiSUN2000/MaxTimeoutMS", 20000, 100, 60000, 0],
+            # Values are only sent on dbus once they moved by more than this. Comma separated "path:absolute[:relative]"
+            # entries, the path may contain wildcards and the first matching entry applies, e.g. "*/Power:1, /Pv/*/V:0:0.01".
+            "deadbands": ["/Settings/HuaweiSUN2000/Deadbands", DEFAULT_DEADBANDS, "", "", 0],
+            # Seconds the driver is profiled for after receiving SIGUSR1
+            "profile_seconds": ["/Settings/HuaweiSUN2000/ProfileSeconds", 60, 1, 3600, 0],
         }
         self.dbus_conn = self._dbusconnection()
         self.settings = SettingsDevice(bus=self.dbus_conn, supportedSettings=supported_settings, eventCallback=self._handle_changed_setting)
@@ -81,3 +130,23 @@ class HuaweiSUN2000Settings(object):
 
     def get_vrm_instance(self):
         return int(self.settings["vrm_instance"].split(":")[1])
+
+    def get_extra_devices(self):
+        """Parse the extra_devices setting into a list of dicts with host, port and unit"""
+        devices = []
+        for entry in self.settings["extra_devices"].replace(";", ",").split(","):
+            parts = entry.strip().split(":")
+            if not parts[0]:
+                continue
+            try:
+                devices.append({
+                    'host': parts[0],
+                    'port': int(parts[1]) if len(parts) > 1 and parts[1] else self.settings["modbus_port"],
+                    'unit': int(parts[2]) if len(parts) > 2 and parts[2] else self.settings["modbus_unit"],
+                })
+            except ValueError:
+                self.logger.error(f"Ignoring invalid entry '{entry.strip()}' in ExtraDevices, expected host[:port[:unit]]")
+        return devices
+
+    def get_deadbands(self):
+        return parse_deadbands(self.settings["deadbands"], self.logger)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Named bits of the State1-3 and Alarm1-3 bitfield registers and the detection of their changes"""
+
+# Alarm levels as used on dbus by Victron: 0 = ok, 1 = warning, 2 = alarm
+OK = 0
+WARNING = 1
+ALARM = 2
+
+# Per register the alarms by bit number: (Huawei alarm ID, dbus name below /Alarms, level when active).
+# Huawei's major alarms are alarms, its minor ones and warnings are warnings.
+ALARMS = {
+    'Alarm1': {
+        0: (2001, 'HighStringInputVoltage', ALARM),
+        1: (2002, 'DcArcFault', ALARM),
+        2: (2011, 'StringReverseConnection', ALARM),
+        3: (2012, 'StringCurrentBackfeed', WARNING),
+        4: (2013, 'AbnormalStringPower', WARNING),
+        5: (2021, 'AfciSelfCheckFailed', ALARM),
+        6: (2031, 'PhaseWireShortCircuitedToPe', ALARM),
+        7: (2032, 'GridLoss', ALARM),
+        8: (2033, 'GridUndervoltage', ALARM),
+        9: (2034, 'GridOvervoltage', ALARM),
+        10: (2035, 'GridVoltageImbalance', ALARM),
+        11: (2036, 'GridOverfrequency', ALARM),
+        12: (2037, 'GridUnderfrequency', ALARM),
+        13: (2038, 'UnstableGridFrequency', ALARM),
+        14: (2039, 'OutputOvercurrent', ALARM),
+        15: (2040, 'OutputDcComponentOverhigh', ALARM),
+    },
+    'Alarm2': {
+        0: (2051, 'AbnormalResidualCurrent', ALARM),
+        1: (2061, 'AbnormalGrounding', ALARM),
+        2: (2062, 'LowInsulationResistance', ALARM),
+        3: (2063, 'Overtemperature', WARNING),
+        4: (2064, 'DeviceFault', ALARM),
+        5: (2065, 'UpgradeFailedOrVersionMismatch', WARNING),
+        6: (2066, 'LicenseExpired', WARNING),
+        7: (61440, 'FaultyMonitoringUnit', WARNING),
+        8: (2067, 'FaultyPowerCollector', ALARM),
+        9: (2068, 'BatteryAbnormal', WARNING),
+        10: (2070, 'ActiveIslanding', ALARM),
+        11: (2071, 'PassiveIslanding', ALARM),
+        12: (2072, 'TransientAcOvervoltage', ALARM),
+        13: (2075, 'PeripheralPortShortCircuit', WARNING),
+        14: (2077, 'ChurnOutputOverload', ALARM),
+        15: (2080, 'AbnormalPvModuleConfiguration', ALARM),
+    },
+    'Alarm3': {
+        0: (2081, 'OptimizerFault', WARNING),
+        1: (2085, 'BuiltInPidOperationAbnormal', WARNING),
+        2: (2014, 'HighInputStringVoltageToGround', ALARM),
+        3: (2086, 'ExternalFanAbnormal', ALARM),
+        4: (2069, 'BatteryReverseConnection', ALARM),
+        5: (2082, 'OnGridOffGridControllerAbnormal', ALARM),
+        6: (2015, 'PvStringLoss', WARNING),
+        7: (2087, 'InternalFanAbnormal', ALARM),
+        8: (2088, 'DcProtectionUnitAbnormal', ALARM),
+        9: (2089, 'ElUnitAbnormal', ALARM),
+        10: (2090, 'ActiveAdjustmentInstructionAbnormal', ALARM),
+        11: (2091, 'ReactiveAdjustmentInstructionAbnormal', ALARM),
+        12: (2092, 'CtWiringAbnormal', ALARM),
+        13: (2003, 'DcArcFaultClearManually', ALARM),
+        14: (2093, 'DcSwitchAbnormal', ALARM),
+        15: (2094, 'LowBatteryDischargeCapacity', WARNING),
+    },
+}
+
+# Per register the meaning of the bits, they are only logged
+STATES = {
+    'State1': {
+        0: 'standby',
+        1: 'grid connected',
+        2: 'grid connected normally',
+        3: 'derating due to power rationing',
+        4: 'derating due to internal causes of the solar inverter',
+        5: 'normal stop',
+        6: 'stop due to faults',
+        7: 'stop due to power rationing',
+        8: 'shutdown',
+        9: 'spot check',
+    },
+    'State2': {
+        0: 'unlocked',
+        1: 'PV connected',
+        2: 'DSP data collection',
+    },
+    'State3': {
+        0: 'off-grid',
+        1: 'off-grid switch enabled',
+    },
+}
+
+
+def paths():
+    """The dbus paths of all alarms"""
+    return ['/Alarms/' + name for bits in ALARMS.values() for _, name, _ in bits.values()]
+
+
+def changed_bits(previous, value):
+    """(bit number, is set) of each bit that differs between previous and value"""
+    bits = []
+    diff = previous ^ value
+    while diff:
+        lowest = diff & -diff
+        bits.append((lowest.bit_length() - 1, bool(value & lowest)))
+        diff ^= lowest
+    return bits
+
+
+class AlarmMonitor:
+    """Turns the State and Alarm registers into dbus values, only reporting what changed since the last poll.
+
+    Comparing a register with its previous value is a single XOR, so an unchanged register costs next to nothing.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._previous = {}  # register name -> last value
+        self._active = {}  # alarm name -> (Huawei alarm ID, level) of the active alarms
+
+    def update(self, values):
+        """Feed the register values (register name -> int), returns {dbus path: value} of what changed.
+
+        The first call reports every alarm, so the dbus paths start out right even after a warm start.
+        """
+        changes = {}
+        for register, value in values.items():
+            previous = self._previous.get(register)
+            self._previous[register] = value
+            if register in ALARMS:
+                bits = ALARMS[register]
+                if previous is None:
+                    changed = [(bit, bool(value & (1 << bit))) for bit in bits]
+                else:
+                    changed = changed_bits(previous, value)
+                for bit, is_set in changed:
+                    if bit not in bits:
+                        continue
+                    code, name, level = bits[bit]
+                    changes['/Alarms/' + name] = level if is_set else OK
+                    if is_set:
+                        self._active[name] = (code, level)
+                        self.logger.warning(f"Alarm {code} raised: {name}")
+                    elif self._active.pop(name, None) is not None:
+                        self.logger.info(f"Alarm {code} cleared: {name}")
+            elif register in STATES and previous is not None:
+                for bit, is_set in changed_bits(previous, value):
+                    text = STATES[register].get(bit, f'bit {bit}')
+                    self.logger.info(f"{register}: {text} {'set' if is_set else 'cleared'}")
+        if changes:
+            changes['/ErrorCode'] = self.error_code()
+        return changes
+
+    def error_code(self):
+        """Huawei alarm ID of the most severe active alarm (the lowest ID among equals), 0 if there is none"""
+        if not self._active:
+            return 0
+        code, _ = min(self._active.values(), key=lambda active: (-active[1], active[0]))
+        return code
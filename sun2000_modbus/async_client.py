@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import errno
+import socket
+import time
+from collections import deque
+
+from gi.repository import GLib
+
+from . import modbus_tcp
+from .metrics import Metrics
+from .rtt import RttEstimator
+
+
+class GLibModbusClient:
+    """Non-blocking Modbus TCP client driven by the GLib main loop.
+
+    Requests are queued with read_range() and sent on a non-blocking socket, replies are
+    picked up by GLib.io_add_watch callbacks. Nothing in here ever waits for the inverter, so
+    the main loop keeps serving dbus while a request is outstanding.
+    """
+
+    def __init__(self, logger, host, port=502, modbus_unit=0, timeout=5, window=1, rtt=None, metrics=None):
+        self.logger = logger
+        self.host = host
+        self.port = port
+        self.modbus_unit = modbus_unit
+        self.timeout = timeout  # for connecting, requests time out after rtt.timeout
+        self.rtt = rtt if rtt is not None else RttEstimator(max_timeout=timeout)
+        self.metrics = metrics if metrics is not None else Metrics(f'{host}:{port}')
+        self._connection_lost = False
+        self.socket = None
+        self.connected = False
+        self.decoder = modbus_tcp.FrameDecoder()
+        self.queue = deque()  # requests waiting to be sent
+        self.inflight = {}  # transaction id -> request we're waiting the reply for
+        # Number of requests that may be in flight at the same time, see Sun2000.pipeline_window
+        self.window = window
+        self.outbuffer = b''
+        self.transaction_id = 0
+        self._watch_id = None
+        self._timeout_id = None
+
+    def read_range(self, start_address, quantity, callback, unit=None):
+        """Queue a read request, callback(payload, error) is called from the main loop once it's done"""
+        self.queue.append({'address': start_address, 'quantity': quantity, 'callback': callback, 'unit': self.modbus_unit if unit is None else unit})
+        if self.socket is None:
+            self._connect()
+        elif self.connected:
+            self._send_next()
+
+    def close(self):
+        self._fail_all(ConnectionError('Connection closed'))
+
+    def _connect(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setblocking(False)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connected = False
+        self._connect_started = time.monotonic()
+        result = self.socket.connect_ex((self.host, self.port))
+        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            self._fail_all(ConnectionError(f'Connection to inverter failed: {errno.errorcode.get(result, result)}'))
+            return
+        self._watch(GLib.IO_OUT)
+        self._timeout_id = GLib.timeout_add(int(self.timeout * 1000), self._on_timeout)
+
+    def _watch(self, condition):
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+        self._watch_id = GLib.io_add_watch(self.socket.fileno(), condition | GLib.IO_ERR | GLib.IO_HUP, self._on_io)
+
+    def _on_io(self, fd, condition):
+        if condition & (GLib.IO_ERR | GLib.IO_HUP):
+            self._watch_id = None
+            self._fail_all(ConnectionError('Connection to inverter lost'))
+            return False
+
+        if not self.connected:
+            # This watch only waited for the connect to finish, it's replaced by a read watch
+            self._watch_id = None
+            error = self.socket.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if error != 0:
+                self._fail_all(ConnectionError(f'Connection to inverter failed: {errno.errorcode.get(error, error)}'))
+                return False
+            self.connected = True
+            if self._connection_lost:
+                self.metrics.count('reconnects')
+                self._connection_lost = False
+            self._cancel_timeout()
+            self.logger.info(f'Successfully connected to inverter in {(time.monotonic() - self._connect_started) * 1000:.0f} ms')
+            self._watch(GLib.IO_IN)
+            self._send_next()
+            return False
+
+        if condition & GLib.IO_IN:
+            try:
+                data = self.socket.recv(4096)
+            except BlockingIOError:
+                data = None
+            except OSError as e:
+                self._watch_id = None
+                self._fail_all(ConnectionError(f'Connection to inverter lost: {e}'))
+                return False
+            if data == b'':
+                self._watch_id = None
+                self._fail_all(ConnectionError('Connection closed by inverter'))
+                return False
+            if data:
+                for transaction_id, unit, pdu in self.decoder.feed(data):
+                    self._complete(transaction_id, pdu)
+
+        if condition & GLib.IO_OUT and self.socket is not None and self.outbuffer:
+            if not self._flush():
+                return False
+            if not self.outbuffer:
+                # Everything is sent, stop waking up for a writable socket
+                self._watch(GLib.IO_IN)
+                return False
+
+        return True
+
+    def _send_next(self):
+        if len(self.inflight) >= self.window or not self.queue:
+            return
+        while self.queue and len(self.inflight) < self.window:
+            request = self.queue.popleft()
+            request['sent'] = time.monotonic()
+            # A request that queues up behind others in the device doesn't tell the round trip time
+            request['sample'] = not self.inflight
+            self.transaction_id = (self.transaction_id + 1) & 0xFFFF
+            self.inflight[self.transaction_id] = request
+            self.outbuffer += modbus_tcp.encode_read_request(self.transaction_id, request['unit'], request['address'], request['quantity'])
+        # The timeout covers the oldest outstanding request
+        if self._timeout_id is None:
+            self._timeout_id = GLib.timeout_add(int(self.rtt.timeout * 1000), self._on_timeout)
+        if self._flush():
+            self._watch(GLib.IO_IN | GLib.IO_OUT if self.outbuffer else GLib.IO_IN)
+
+    def _flush(self):
+        """Write as much of the pending request as the socket takes, return False if the connection broke"""
+        try:
+            sent = self.socket.send(self.outbuffer)
+        except BlockingIOError:
+            return True
+        except OSError as e:
+            self._fail_all(ConnectionError(f'Connection to inverter lost: {e}'))
+            return False
+        self.outbuffer = self.outbuffer[sent:]
+        return True
+
+    def _complete(self, transaction_id, pdu):
+        request = self.inflight.pop(transaction_id, None)
+        if request is None:
+            self.logger.warning(f'Ignoring unexpected Modbus reply with transaction id {transaction_id}')
+            return
+        self._cancel_timeout()
+        elapsed = time.monotonic() - request['sent']
+        if request['sample']:
+            self.rtt.update(elapsed)
+        if self.inflight:
+            self._timeout_id = GLib.timeout_add(int(self.rtt.timeout * 1000), self._on_timeout)
+        try:
+            payload, error = modbus_tcp.decode_read_response(pdu), None
+        except ValueError as e:
+            payload, error = None, e
+            self.metrics.count('errors')
+        self.metrics.request(request['address'], request['quantity'], elapsed, len(payload) // 2 if payload is not None else 0)
+        request['callback'](payload, error)
+        self._send_next()
+
+    def _on_timeout(self):
+        self._timeout_id = None
+        if self.connected:
+            self.rtt.backoff()
+        self._fail_all(TimeoutError('No reply from inverter'))
+        return False
+
+    def _cancel_timeout(self):
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+
+    def _fail_all(self, error):
+        """Drop the connection and fail every queued request, a new request reconnects"""
+        self._cancel_timeout()
+        if self._watch_id is not None:
+            GLib.source_remove(self._watch_id)
+            self._watch_id = None
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+        self.connected = False
+        self.decoder.reset()
+        self.outbuffer = b''
+        requests = list(self.inflight.values()) + list(self.queue)
+        self.inflight.clear()
+        self.queue.clear()
+        if requests:
+            self.logger.error(f"Connection error occurred: {error}")
+            self.metrics.count('errors')
+            self._connection_lost = True
+        for request in requests:
+            request['callback'](None, error)
@@ -15,6 +15,18 @@ class DataType(Enum):
     MULTIDATA = "multidata"
 
 
+# struct formats of the numeric data types, registers using these are decoded with struct.unpack_from()
+STRUCT_FORMATS = {
+    DataType.UINT16_BE: 'H',
+    DataType.UINT32_BE: 'I',
+    DataType.INT16_BE: 'h',
+    DataType.INT32_BE: 'i',
+    # Bitfields are plain unsigned integers, test the bits with & (see alarms.py)
+    DataType.BITFIELD16: 'H',
+    DataType.BITFIELD32: 'I',
+}
+
+
 def decode_string(value):
     return value.decode("utf-8", "replace").strip("\0")
 
@@ -27,19 +39,13 @@ def decode_int_be(value):
     return int.from_bytes(value, byteorder="big", signed=True)
 
 
-def decode_bitfield(value):
-    return ''.join(format(byte, '08b') for byte in value)
-
-
 def decode(value, data_type):
     if data_type == DataType.STRING:
         return decode_string(value)
-    elif data_type in [DataType.UINT16_BE, DataType.UINT32_BE]:
+    elif data_type in [DataType.UINT16_BE, DataType.UINT32_BE, DataType.BITFIELD16, DataType.BITFIELD32]:
         return decode_uint_be(value)
     elif data_type in [DataType.INT16_BE, DataType.INT32_BE]:
         return decode_int_be(value)
-    elif data_type in [DataType.BITFIELD16, DataType.BITFIELD32]:
-        return decode_bitfield(value)
     elif data_type == DataType.MULTIDATA:
         return value
     else:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import json
+import os
+
+from . import planner
+from . import register_map
+from .modbus_tcp import ModbusExceptionResponse
+
+# Modbus exception code for a register address the device doesn't know
+ILLEGAL_DATA_ADDRESS = 0x02
+
+
+def identify(inverter, register_maps):
+    """Return (register map, serial number) of the first register map whose SN register the device answers"""
+    for candidate in register_maps:
+        try:
+            return candidate, inverter.read(candidate.SN)
+        except ModbusExceptionResponse as e:
+            if e.exception_code != ILLEGAL_DATA_ADDRESS:
+                raise
+    raise ValueError("The device doesn't answer any of the known register maps")
+
+
+def find_unsupported(inverter, registers, max_gap=0):
+    """Probe registers in blocks and find what the device rejects with an illegal address response.
+
+    A block that is rejected as a whole is probed register by register, so a single unsupported
+    register doesn't cost all its neighbours. Registers within the addresses of a rejected one are
+    rejected as well, without asking the device again. The device may also reject an address in a
+    gap between the registers (e.g. one the model doesn't have), so the gaps of a rejected block are
+    probed as well. Returns (set of unsupported registers, set of rejected gap addresses).
+    """
+    unsupported = set()
+    rejected_addresses = set()
+    for block in planner.plan_blocks(registers, max_gap=max_gap):
+        if _accepts(inverter, block.start_address, block.quantity):
+            continue
+        for register in block.registers:
+            if register in unsupported:
+                continue
+            if not _accepts(inverter, register.value.address, register.value.quantity):
+                unsupported.add(register)
+                end_address = register.value.address + register.value.quantity
+                unsupported.update(other for other in register_map.index(type(register)).overlapping(register)
+                                   if other in block.registers and other.value.address + other.value.quantity <= end_address)
+        covered = {address for register in block.registers for address in range(register.value.address, register.value.address + register.value.quantity)}
+        for start, end in _runs(address for address in range(block.start_address, block.end_address) if address not in covered):
+            # Most gaps are fine, only a rejected one is probed address by address
+            if not _accepts(inverter, start, end - start):
+                rejected = {address for address in range(start, end) if end - start == 1 or not _accepts(inverter, address, 1)}
+                # If the device only rejects the range as a whole, none of it may be bridged
+                rejected_addresses.update(rejected or range(start, end))
+    return unsupported, rejected_addresses
+
+
+def _accepts(inverter, address, quantity):
+    """Whether the device answers a read of the address range, False for an illegal address response"""
+    try:
+        inverter.read_range(address, quantity=quantity)
+        return True
+    except ModbusExceptionResponse as e:
+        if e.exception_code != ILLEGAL_DATA_ADDRESS:
+            raise
+        return False
+
+
+def _runs(addresses):
+    """Group ascending addresses into (start, end) ranges of consecutive ones, end exclusive"""
+    runs = []
+    for address in addresses:
+        if runs and runs[-1][1] == address:
+            runs[-1][1] = address + 1
+        else:
+            runs.append([address, address + 1])
+    return runs
+
+
+class DeviceCache:
+    """Discovery results per serial number, persisted as a small JSON file"""
+
+    def __init__(self, logger, path):
+        self.logger = logger
+        self.path = path
+        self.devices = {}
+        try:
+            with open(path) as f:
+                self.devices = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable device cache {path}: {e}")
+
+    def get(self, serial_number):
+        return self.devices.get(serial_number)
+
+    def put(self, serial_number, entry):
+        self.devices[serial_number] = entry
+        try:
+            # Write to a temporary file first, a power cut must not leave a truncated cache behind
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self.devices, f, indent=1, sort_keys=True)
+            os.replace(self.path + '.tmp', self.path)
+        except OSError as e:
+            self.logger.warning(f"Couldn't write device cache {self.path}: {e}")
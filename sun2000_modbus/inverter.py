@@ -1,43 +1,129 @@
 #!/usr/bin/env python3
 # Please adhere to flake8 --ignore E501,E402
 
+import logging
+import struct
 import time
+from enum import Enum
 
 from pymodbus.client.sync import ModbusTcpClient
 from pymodbus.exceptions import ModbusIOException, ConnectionException
 
-from . import datatypes
+from . import modbus_tcp
+from .metrics import Metrics
+from . import planner
+from .rtt import RttEstimator
+
+
+class ConnectionState(Enum):
+    DISCONNECTED = "disconnected"
+    CONNECTED = "connected"
+    FAILED = "failed"  # the last connect attempt failed, the next one is due after the backoff
 
 
 class Sun2000:
-    def __init__(self, logger, host, port=502, timeout=5, wait=2, modbus_unit=0, max_retries=3, backoff_in_seconds=1, backoff_factor=2.0):  # some models need modbus_unit=1
+    def __init__(self, logger, host, port=502, timeout=5, wait=2, modbus_unit=0, max_retries=3, backoff_in_seconds=1, backoff_factor=2.0, probe_address=None, probe_timeout=1, max_backoff=60, client=None, pipeline_window=1, rtt=None, metrics=None):  # some models need modbus_unit=1
         self.logger = logger
+        # Maximum time to wait for the device to answer after connecting
         self.wait = wait
         self.modbus_unit = modbus_unit
         self.max_retries = max_retries
         self.backoff_in_seconds = backoff_in_seconds
         self.backoff_factor = backoff_factor
-        self.inverter = ModbusTcpClient(host, port, timeout=timeout)
+        self.max_backoff = max_backoff
+        # A cheap register that is read to find out whether the device is ready after connecting
+        self.probe_address = probe_address
+        self.probe_timeout = probe_timeout
+        # Several units behind the same gateway (e.g. a SmartLogger) can share one client and thus one connection
+        self.inverter = client if client is not None else ModbusTcpClient(host, port, timeout=timeout)
+        # Request timeouts follow the measured round trip time, timeout is only the upper limit.
+        # Units that share a client should share the estimator as well.
+        self.rtt = rtt if rtt is not None else RttEstimator(max_timeout=timeout)
+        # Request latencies, retries, errors, ... of the connection, shared like the estimator
+        self.metrics = metrics if metrics is not None else Metrics(f'{host}:{port}')
+        self._connection_lost = False
+        self.state = ConnectionState.DISCONNECTED
+        self.last_reconnect_latency = None
+        self._reconnect_allowed = True
+        self._next_attempt = 0
+        self._backoff = backoff_in_seconds
+        # Number of requests that may be in flight at the same time, 1 = wait for each reply before sending the next request.
+        # Only gateways like the SmartLogger or EMMA handle more than one outstanding transaction.
+        self.pipeline_window = pipeline_window
+        self._transaction_id = 0
 
-    def connect(self):
-        if not self.isConnected():
-            self.inverter.connect()
-            time.sleep(self.wait)
-            if self.isConnected():
-                self.logger.info('Successfully connected to inverter')
-                return True
-            else:
-                self.logger.error('Connection to inverter failed')
-                return False
-        else:
+    def begin_cycle(self):
+        """Allow one (re)connect attempt during the upcoming poll cycle"""
+        self._reconnect_allowed = True
+
+    def connect(self, probe=True):
+        """Connect unless connected, probe=False skips the readiness probe and leaves that to the first real read"""
+        if self.isConnected():
             return True
 
+        # Reconnect at most once per cycle and not before the backoff expired, a dead
+        # inverter then costs one connect attempt instead of one per register.
+        if not self._reconnect_allowed or time.monotonic() < self._next_attempt:
+            return False
+        self._reconnect_allowed = False
+
+        started = time.monotonic()
+        self.inverter.connect()
+        if self.isConnected() and (not probe or self._probe()):
+            # Reconnecting after a deliberate disconnect (e.g. in burst mode) isn't worth an info message every cycle
+            level = logging.DEBUG if self.state == ConnectionState.DISCONNECTED and self.last_reconnect_latency is not None else logging.INFO
+            if self._connection_lost or self.state == ConnectionState.FAILED:
+                self.metrics.count('reconnects')
+            self._connection_lost = False
+            self.state = ConnectionState.CONNECTED
+            self._backoff = self.backoff_in_seconds
+            self.last_reconnect_latency = time.monotonic() - started
+            self.logger.log(level, f'Successfully connected to inverter in {self.last_reconnect_latency * 1000:.0f} ms')
+            return True
+
+        self.inverter.close()
+        self.state = ConnectionState.FAILED
+        self._next_attempt = time.monotonic() + self._backoff
+        self.logger.error(f'Connection to inverter failed, next attempt in {self._backoff} seconds')
+        self._backoff = min(self._backoff * self.backoff_factor, self.max_backoff)
+        return False
+
+    def reset_backoff(self):
+        """Allow a connect attempt right away, for callers that keep a backoff of their own (the circuit breaker)"""
+        self._reconnect_allowed = True
+        self._next_attempt = 0
+
+    def _probe(self):
+        """Wait until the device answers a cheap read, but no longer than self.wait seconds"""
+        if self.probe_address is None:
+            time.sleep(self.wait)
+            return self.isConnected()
+
+        deadline = time.monotonic() + self.wait
+        timeout = self.inverter.timeout
+        self.inverter.timeout = self.probe_timeout
+        try:
+            while True:
+                try:
+                    response = self.inverter.read_holding_registers(self.probe_address, 1, unit=self.modbus_unit)
+                    # Any reply, even a Modbus exception, means the device is listening
+                    if not isinstance(response, ModbusIOException):
+                        return True
+                except (ConnectionException, ModbusIOException):
+                    pass
+                if not self.isConnected() or time.monotonic() >= deadline:
+                    return False
+                time.sleep(0.1)
+        finally:
+            self.inverter.timeout = timeout
+
     def disconnect(self):
         """Close the underlying tcp socket"""
         # Some Sun2000 models with the SDongle WLAN-FE require the TCP connection to be closed
         # as soon as possible. Leaving the TCP connection open for an extended time may cause
         # dongle reboots and/or FusionSolar portal updates to be delayed or even paused.
         self.inverter.close()
+        self.state = ConnectionState.DISCONNECTED
 
     def isConnected(self):
         """Check if underlying tcp socket is open"""
@@ -47,49 +133,141 @@ class Sun2000:
     def connected(self):
         return self.isConnected()
 
-    def read_raw_value(self, register):
+    def _read_holding_registers(self, address, quantity):
         retries = 0
-        backoff = self.backoff_in_seconds
         while True:
-            if not self.isConnected():
-                self.connect()
-
-            if not self.isConnected():
-                if retries >= self.max_retries:
-                    raise ValueError('Inverter is not connected')
-                self.logger.warning(f"Inverter not connected, retrying in {backoff} seconds...")
-                time.sleep(backoff)
-                retries += 1
-                backoff *= self.backoff_factor
-                continue
+            if not self.connect():
+                raise ValueError('Inverter is not connected')
 
             try:
-                register_value = self.inverter.read_holding_registers(register.value.address, register.value.quantity, unit=self.modbus_unit)
-                if isinstance(register_value, ModbusIOException):
-                    raise register_value
+                self.inverter.timeout = self.rtt.timeout
+                started = time.monotonic()
+                response = self.inverter.read_holding_registers(address, quantity, unit=self.modbus_unit)
+                if isinstance(response, ModbusIOException):
+                    raise response
+                elapsed = time.monotonic() - started
+                self.rtt.update(elapsed)
+                if response.isError():
+                    # E.g. an illegal address, retrying won't help
+                    self.metrics.request(address, quantity, elapsed, 0)
+                    self.metrics.count('errors')
+                    raise modbus_tcp.ModbusExceptionResponse(response.function_code & 0x7F, response.exception_code)
+                self.metrics.request(address, quantity, elapsed, len(response.registers))
+                return response
             except (ConnectionException, ModbusIOException) as e:
                 self.logger.error(f"Connection error occurred: {e}")
+                self.metrics.count('errors')
+                self.rtt.backoff()
+                # A late reply would be mistaken for the answer to the next request, so start over with
+                # a fresh connection. connect() takes care of not reconnecting more than once per cycle.
+                self.disconnect()
+                self._connection_lost = True
                 if retries >= self.max_retries:
                     raise
-                self.logger.warning(f"Retrying in {backoff} seconds...")
-                time.sleep(backoff)
                 retries += 1
-                backoff *= self.backoff_factor
-                continue
+                self.metrics.count('retries')
+                self.logger.warning(f"Retrying ({retries}/{self.max_retries})...")
 
-            return datatypes.decode(register_value.encode()[1:], register.value.data_type)
+    @staticmethod
+    def _payload(response):
+        """The register words of a response as big endian bytes, the decoders unpack the values straight from it"""
+        return struct.pack(f'>{len(response.registers)}H', *response.registers)
+
+    def read_raw_value(self, register):
+        return register.value.decode_raw(self._payload(self._read_holding_registers(register.value.address, register.value.quantity)))
 
     def read(self, register):
-        raw_value = self.read_raw_value(register)
+        return register.value.decode(self._payload(self._read_holding_registers(register.value.address, register.value.quantity)))
+
+    def read_formatted(self, register, use_locale=False):
+        return self.format_value(register, self.read(register), use_locale)
+
+    def read_registers(self, registers, max_gap=0, holes=()):
+        """Read several registers with as few requests as possible.
+
+        The registers are merged into contiguous blocks (see planner.plan_blocks, no gap spans one
+        of the holes), each block is
+        fetched with a single request and the values are decoded from the block payload.
+        Returns a dict mapping each register to its value (gain applied, as with read()).
+        """
+        values = {}
+        blocks = planner.plan_blocks(registers, max_gap=max_gap, holes=holes)
+        if self.pipeline_window > 1 and len(blocks) > 1:
+            payloads = self._read_pipelined(blocks)
+        else:
+            payloads = {block: self.read_range(block.start_address, quantity=block.quantity) for block in blocks}
+        started = time.monotonic()
+        for block, payload in payloads.items():
+            values.update(block.decode(payload))
+        self.metrics.observe('decode', time.monotonic() - started)
+        return values
+
+    def _read_pipelined(self, blocks):
+        """Read all blocks with up to pipeline_window requests in flight, returns a dict block -> payload"""
+        retries = 0
+        while True:
+            if not self.connect():
+                raise ValueError('Inverter is not connected')
 
+            try:
+                return self._transact_pipelined(blocks)
+            # ValueError also covers Modbus exception responses and malformed or unexpected replies
+            except (OSError, ConnectionException, ValueError, struct.error) as e:
+                self.logger.error(f"Connection error occurred: {e}")
+                self.metrics.count('errors')
+                if isinstance(e, TimeoutError):
+                    self.rtt.backoff()
+                # Replies to the other requests may still be on their way, start over with a fresh connection
+                self.disconnect()
+                self._connection_lost = True
+                if retries >= self.max_retries or isinstance(e, modbus_tcp.ModbusExceptionResponse):
+                    raise
+                retries += 1
+                self.metrics.count('retries')
+                self.logger.warning(f"Retrying ({retries}/{self.max_retries})...")
+
+    def _transact_pipelined(self, blocks):
+        # We talk to the socket of the pymodbus client directly, pymodbus itself only does one request at a time
+        sock = self.inverter.socket
+        # Replies can queue up behind each other, so allow one timeout per request in flight
+        sock.settimeout(self.rtt.timeout * min(self.pipeline_window, len(blocks)))
+        decoder = modbus_tcp.FrameDecoder()
+        queue = list(blocks)
+        pending = {}  # transaction id -> (block, time the request was sent, whether it feeds the RTT estimate)
+        payloads = {}
+        while queue or pending:
+            while queue and len(pending) < self.pipeline_window:
+                block = queue.pop(0)
+                self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+                # Only requests sent with nothing else in flight measure the round trip, the others also wait
+                # behind the requests before them. Each call starts with an empty pipeline, so there's always one.
+                pending[self._transaction_id] = (block, time.monotonic(), not pending)
+                sock.sendall(modbus_tcp.encode_read_request(self._transaction_id, self.modbus_unit, block.start_address, block.quantity))
+            data = sock.recv(4096)
+            if not data:
+                raise ConnectionException('Connection closed by inverter')
+            for transaction_id, unit, pdu in decoder.feed(data):
+                block, sent, sample = pending.pop(transaction_id, (None, None, False))
+                if block is None:
+                    self.logger.warning(f'Ignoring unexpected Modbus reply with transaction id {transaction_id}')
+                    continue
+                elapsed = time.monotonic() - sent
+                if sample:
+                    self.rtt.update(elapsed)
+                payloads[block] = modbus_tcp.decode_read_response(pdu)
+                # Includes the time the request waited behind the others in the device
+                self.metrics.request(block.start_address, block.quantity, elapsed, len(payloads[block]) // 2)
+        return payloads
+
+    @staticmethod
+    def apply_gain(register, raw_value):
         if register.value.gain is None:
             return raw_value
         else:
             return raw_value / register.value.gain
 
-    def read_formatted(self, register, use_locale=False):
-        value = self.read(register)
-
+    @staticmethod
+    def format_value(register, value, use_locale=False):
         if register.value.unit is not None:
             if use_locale:
                 return f'{value:n} {register.value.unit}'
@@ -111,33 +289,4 @@ class Sun2000:
         if end_address != 0:
             quantity = end_address - start_address + 1
 
-        retries = 0
-        backoff = self.backoff_in_seconds
-        while True:
-            if not self.isConnected():
-                self.connect()
-
-            if not self.isConnected():
-                if retries >= self.max_retries:
-                    raise ValueError('Inverter is not connected')
-                self.logger.warning(f"Inverter not connected, retrying in {backoff} seconds...")
-                time.sleep(backoff)
-                retries += 1
-                backoff *= self.backoff_factor
-                continue
-
-            try:
-                register_range_value = self.inverter.read_holding_registers(start_address, quantity, unit=self.modbus_unit)
-                if isinstance(register_range_value, ModbusIOException):
-                    raise register_range_value
-            except (ConnectionException, ModbusIOException) as e:
-                self.logger.error(f"Connection error occurred: {e}")
-                if retries >= self.max_retries:
-                    raise
-                self.logger.warning(f"Retrying in {backoff} seconds...")
-                time.sleep(backoff)
-                retries += 1
-                backoff *= self.backoff_factor
-                continue
-
-            return datatypes.decode(register_range_value.encode()[1:], datatypes.DataType.MULTIDATA)
+        return self._payload(self._read_holding_registers(start_address, quantity))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets in ms, one more bucket takes everything above the last one
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# Size of a "read holding registers" request and of the reply without its data, MBAP header included
+REQUEST_BYTES = 12
+REPLY_HEADER_BYTES = 9
+
+
+class Histogram:
+    """Durations counted in fixed buckets, cheap enough to update for every request"""
+
+    def __init__(self, bounds_ms=BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.buckets = [0] * (len(bounds_ms) + 1)
+        self.count = 0
+        self.total = 0.0  # seconds
+        self.max = 0.0  # seconds
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(self.bounds_ms, seconds * 1000)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean_ms(self):
+        return self.total / self.count * 1000 if self.count else None
+
+    def percentile_ms(self, q):
+        """Upper bound of the bucket the q-th percentile (0..100) falls into, the maximum for the last bucket"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds_ms, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+    def format(self):
+        if not self.count:
+            return "n=0"
+        buckets = ' '.join(f"<={bound}:{count}" for bound, count in zip(self.bounds_ms, self.buckets) if count)
+        if self.buckets[-1]:
+            buckets += f" >{self.bounds_ms[-1]}:{self.buckets[-1]}"
+        return (f"n={self.count} mean={self.mean_ms:.1f}ms p50={self.percentile_ms(50):.1f}ms p95={self.percentile_ms(95):.1f}ms "
+                f"max={self.max * 1000:.1f}ms | {buckets}")
+
+
+class Metrics:
+    """Counters and duration histograms, e.g. of one Modbus connection.
+
+    Updated from the poll threads and read from the main loop, hence the lock.
+    """
+
+    COUNTERS = ('requests', 'errors', 'retries', 'reconnects', 'bytes_sent', 'bytes_received')
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        self.histograms = {}  # name -> Histogram
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def request(self, address, quantity, seconds, registers):
+        """Record an answered read request of the block at address, registers is the number of registers in the reply"""
+        self.count('requests')
+        self.count('bytes_sent', REQUEST_BYTES)
+        self.count('bytes_received', REPLY_HEADER_BYTES + 2 * registers)
+        self.observe('request', seconds)
+        self.observe(f'block {address}+{quantity}', seconds)
+
+    def percentile_ms(self, name, q):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            return histogram.percentile_ms(q) if histogram is not None else None
+
+    def mean_ms(self, name):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            return histogram.mean_ms if histogram is not None else None
+
+    def format(self):
+        """Text snapshot of all counters and histograms"""
+        with self._lock:
+            lines = [f"[{self.name}]"]
+            lines += [f"{name} {value}" for name, value in self.counters.items()]
+            lines += [f"{name}: {self.histograms[name].format()}" for name in sorted(self.histograms)]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Minimal Modbus TCP framing for "read holding registers" (function code 0x03)"""
+
+import struct
+
+READ_HOLDING_REGISTERS = 0x03
+
+# transaction id, protocol id, length, unit id
+MBAP_HEADER = struct.Struct('>HHHB')
+READ_REQUEST = struct.Struct('>HHHBBHH')
+
+
+class ModbusExceptionResponse(ValueError):
+    """The device answered the request with a Modbus exception code"""
+
+    def __init__(self, function_code, exception_code):
+        super().__init__(f"Modbus exception {exception_code} for function code {function_code:#04x}")
+        self.function_code = function_code
+        self.exception_code = exception_code
+
+
+def encode_read_request(transaction_id, unit, address, quantity):
+    # The length field counts the unit id and the PDU (function code, address, quantity)
+    return READ_REQUEST.pack(transaction_id & 0xFFFF, 0, 6, unit, READ_HOLDING_REGISTERS, address, quantity)
+
+
+def decode_read_response(pdu):
+    """Return the register payload of a read holding registers response PDU, as a memoryview into pdu"""
+    function_code = pdu[0]
+    if function_code & 0x80:
+        raise ModbusExceptionResponse(function_code & 0x7F, pdu[1])
+    if function_code != READ_HOLDING_REGISTERS:
+        raise ValueError(f"Unexpected function code {function_code:#04x} in response")
+    byte_count = pdu[1]
+    if len(pdu) < 2 + byte_count:
+        raise ValueError("Truncated read holding registers response")
+    return memoryview(pdu)[2:2 + byte_count]
+
+
+class FrameDecoder:
+    """Splits a TCP byte stream into Modbus TCP frames"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes, return a list of complete (transaction_id, unit, pdu) frames"""
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= MBAP_HEADER.size:
+            transaction_id, protocol_id, length, unit = MBAP_HEADER.unpack_from(self.buffer)
+            end = MBAP_HEADER.size - 1 + length
+            if len(self.buffer) < end:
+                break
+            # One copy per frame, everything decoded from it afterwards works on memoryviews
+            with memoryview(self.buffer) as view:
+                frames.append((transaction_id, unit, bytes(view[MBAP_HEADER.size:end])))
+            del self.buffer[:end]
+        return frames
+
+    def reset(self):
+        self.buffer.clear()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import struct
+
+# A single "read holding registers" request can return at most 125 registers
+MAX_QUANTITY = 125
+
+
+class ReadBlock:
+    """A contiguous address range that is fetched with a single Modbus request"""
+
+    def __init__(self, start_address, end_address):
+        self.start_address = start_address
+        self.end_address = end_address  # exclusive
+        self.registers = []
+        self._struct = None
+
+    @property
+    def quantity(self):
+        return self.end_address - self.start_address
+
+    def offset(self, register):
+        """Byte offset of the given register within the block payload"""
+        return (register.value.address - self.start_address) * 2
+
+    def _compile(self):
+        """Build one struct that unpacks all numeric registers of the block at once, gaps become pad bytes.
+
+        Called by _plan_blocks() once the block is complete, before the plan is cached and shared between threads.
+        """
+        fmt = '>'
+        position = self.start_address
+        self._fields = []
+        self._others = []  # strings, raw data and registers overlapping another one are decoded on their own
+        for register in sorted(self.registers, key=lambda r: r.value.address):
+            if register.value.format is not None and register.value.address >= position:
+                if register.value.address > position:
+                    fmt += f'{(register.value.address - position) * 2}x'
+                fmt += register.value.format
+                self._fields.append((register, register.value.gain))
+                position = register.value.address + register.value.quantity
+            else:
+                self._others.append(register)
+        self._struct = struct.Struct(fmt)
+
+    def decode(self, payload):
+        """Decode all registers of this block from the block payload, returns a dict register -> value (gain applied)"""
+        values = {}
+        for (register, gain), value in zip(self._fields, self._struct.unpack_from(payload)):
+            values[register] = value if gain is None else value / gain
+        for register in self._others:
+            values[register] = register.value.decode(payload, self.offset(register))
+        return values
+
+    def __repr__(self):
+        return f"ReadBlock({self.start_address}, {self.quantity}, {[r.name for r in self.registers]})"
+
+
+# Plans by (registers, max_gap, max_quantity, holes), the same few register sets are read over and over again
+_plans = {}
+
+
+def plan_blocks(registers, max_gap=0, max_quantity=MAX_QUANTITY, holes=()):
+    """Merge registers into as few contiguous blocks as possible.
+
+    Two registers end up in the same block if no more than max_gap unrequested
+    addresses lie between them, none of them is one of the holes (addresses the
+    device rejects) and the resulting block doesn't exceed max_quantity.
+    The blocks are cached and shared, don't modify them.
+    """
+    key = (frozenset(registers), max_gap, max_quantity, frozenset(holes))
+    blocks = _plans.get(key)
+    if blocks is None:
+        if len(_plans) >= 64:
+            _plans.clear()
+        blocks = _plans[key] = _plan_blocks(key[0], max_gap, max_quantity, key[3])
+    return blocks
+
+
+def _plan_blocks(registers, max_gap, max_quantity, holes):
+    blocks = []
+    for register in sorted(registers, key=lambda r: (r.value.address, r.value.quantity)):
+        start = register.value.address
+        end = start + register.value.quantity
+        if blocks:
+            block = blocks[-1]
+            bridges_hole = any(block.end_address <= hole < start for hole in holes)
+            if start - block.end_address <= max_gap and max(end, block.end_address) - block.start_address <= max_quantity and not bridges_hole:
+                block.end_address = max(end, block.end_address)
+                block.registers.append(register)
+                continue
+        block = ReadBlock(start, end)
+        block.registers.append(register)
+        blocks.append(block)
+    for block in blocks:
+        block._compile()
+    return blocks
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+from enum import Enum
+
+
+class PollClass(Enum):
+    FAST = "fast"  # read once every cycle
+    SLOW = "slow"  # read every slow_interval seconds
+    STATIC = "static"  # read once, the value is cached for the lifetime of the scheduler
+
+
+class PollScheduler:
+    """Keeps track of when each register was last read and caches its value"""
+
+    def __init__(self, slow_interval=60):
+        self.slow_interval = slow_interval
+        self.values = {}
+        self.last_read = {}
+        self.cycle_started = float('-inf')
+
+    def begin_cycle(self, now):
+        """FAST registers that were read since now are served from the cache for the rest of the cycle"""
+        self.cycle_started = now
+
+    def is_due(self, register, poll_class, now):
+        if register not in self.last_read:
+            return True
+        if poll_class == PollClass.FAST:
+            return self.last_read[register] < self.cycle_started
+        if poll_class == PollClass.SLOW:
+            return now - self.last_read[register] >= self.slow_interval
+        return False
+
+    def due(self, polls, now):
+        """Return the registers of polls (a dict register -> PollClass) that have to be read now"""
+        return [register for register, poll_class in polls.items() if self.is_due(register, poll_class, now)]
+
+    def update(self, values, now):
+        for register, value in values.items():
+            self.values[register] = value
+            self.last_read[register] = now
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Register maps loaded from register_maps.csv, turned into Enum classes the first time they're used"""
+
+import bisect
+import os
+import struct
+from enum import Enum
+
+from . import datatypes
+from . import mappings
+from .registers import Register, AccessType
+
+DATA_FILES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), 'register_maps.csv')]
+
+_rows = None  # register map name -> list of (location, fields) rows
+_maps = {}  # register map name -> Enum
+_indexes = {}  # Enum -> RegisterIndex
+
+
+def add_data_file(path):
+    """Add a file in the format of register_maps.csv, its registers extend or replace the built-in ones.
+
+    Must be called before the first register map is used.
+    """
+    global _rows
+    DATA_FILES.append(path)
+    _rows = None
+
+
+def _parse(path, rows):
+    section = None
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('[') and line.endswith(']'):
+                section = rows.setdefault(line[1:-1], [])
+                continue
+            fields = line.split(',')
+            if section is None or len(fields) != 8:
+                raise ValueError(f"{path}:{number}: expected a [section] or 8 comma separated fields")
+            section.append((f"{path}:{number}", fields))
+
+
+def _register(location, fields):
+    name, address, quantity, data_type, gain, unit, access_type, mapping = fields
+    gain = None if gain == '' else float(gain) if '.' in gain else int(gain)
+    data_type = datatypes.DataType(data_type)
+    # The blocks are decoded with one struct per block, a wrong size would shift all registers behind this one
+    fmt = datatypes.STRUCT_FORMATS.get(data_type)
+    if fmt is not None and int(quantity) * 2 != struct.calcsize('>' + fmt):
+        raise ValueError(f"{location}: {name} is {data_type.value}, which needs a quantity of {struct.calcsize('>' + fmt) // 2}, not {quantity}")
+    return name, Register(int(address), int(quantity), data_type, gain, unit or None, AccessType(access_type),
+                          getattr(mappings, mapping) if mapping else None)
+
+
+def load(name, module=None):
+    """Return the register map with the given name as Enum, the members' values are the Registers"""
+    global _rows
+    if name not in _maps:
+        if _rows is None:
+            _rows = {}
+            for path in DATA_FILES:
+                _parse(path, _rows)
+        if name not in _rows:
+            raise KeyError(f"Unknown register map {name}")
+        # Later rows (e.g. from an added data file) replace earlier ones with the same name
+        registers = dict(_register(location, fields) for location, fields in _rows[name])
+        _maps[name] = Enum(name, list(registers.items()), module=module or __name__)
+    return _maps[name]
+
+
+def index(register_map):
+    """Return the (cached) RegisterIndex of a register map"""
+    if register_map not in _indexes:
+        _indexes[register_map] = RegisterIndex(register_map)
+    return _indexes[register_map]
+
+
+class RegisterIndex:
+    """The registers of a register map sorted by address, for range and overlap queries"""
+
+    def __init__(self, register_map):
+        self.registers = sorted(register_map, key=lambda r: (r.value.address, r.value.quantity))
+        self._starts = [register.value.address for register in self.registers]
+        self._max_quantity = max((register.value.quantity for register in self.registers), default=1)
+
+    def in_range(self, start_address, end_address):
+        """Registers that have at least one address in start_address..end_address (exclusive)"""
+        first = bisect.bisect_left(self._starts, start_address - self._max_quantity + 1)
+        last = bisect.bisect_left(self._starts, end_address)
+        return [register for register in self.registers[first:last] if register.value.address + register.value.quantity > start_address]
+
+    def overlapping(self, register):
+        """Other registers that share an address with the given one (e.g. ModelID and RatedPower in V2)"""
+        return [other for other in self.in_range(register.value.address, register.value.address + register.value.quantity) if other is not register]
+
+    def overlaps(self):
+        """All groups of registers that share addresses"""
+        groups = []
+        group, group_end = [], None
+        for register in self.registers:
+            if group and register.value.address < group_end:
+                group.append(register)
+                group_end = max(group_end, register.value.address + register.value.quantity)
+                continue
+            if len(group) > 1:
+                groups.append(group)
+            group, group_end = [register], register.value.address + register.value.quantity
+        if len(group) > 1:
+            groups.append(group)
+        return groups
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # Please adhere to flake8 --ignore E501,E402
 
+import struct
 from enum import Enum
 
 from . import datatypes
@@ -29,3 +30,20 @@ class Register:
         self.unit = unit
         self.access_type = access_type
         self.mapping = mapping
+        # Compiled once, so decoding a value doesn't need to look at the data type again
+        self.format = datatypes.STRUCT_FORMATS.get(data_type)
+        self._struct = struct.Struct('>' + self.format) if self.format is not None else None
+
+    def decode_raw(self, buffer, offset=0):
+        """Decode the value of this register from buffer (bytes or memoryview), starting at the given byte offset"""
+        if self._struct is not None:
+            return self._struct.unpack_from(buffer, offset)[0]
+        # Only strings and raw data end up here, they need a copy of their own bytes anyway
+        return datatypes.decode(bytes(memoryview(buffer)[offset:offset + self.quantity * 2]), self.data_type)
+
+    def decode(self, buffer, offset=0):
+        """Like decode_raw(), with the gain applied"""
+        value = self.decode_raw(buffer, offset)
+        if self.gain is not None:
+            value = value / self.gain
+        return value
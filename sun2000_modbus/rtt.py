@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+
+class RttEstimator:
+    """Smoothed round trip time of a Modbus connection and the request timeout derived from it.
+
+    Works like the TCP retransmission timer (RFC 6298): timeout = srtt + 4 * rttvar, kept between
+    min_timeout and max_timeout. Until the first reply arrived the timeout is max_timeout, a
+    request that timed out doubles it until the next sample comes in.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+
+    def __init__(self, min_timeout=0.3, max_timeout=20):
+        self.min_timeout = min_timeout
+        self.max_timeout = max(min_timeout, max_timeout)
+        self.srtt = None
+        self.rttvar = None
+        self.timeout = self.max_timeout
+
+    def update(self, rtt):
+        """Feed the round trip time of an answered request in seconds"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.timeout = min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+    def backoff(self):
+        """A request timed out, be more patient with the next one"""
+        self.timeout = min(self.max_timeout, self.timeout * 2)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Counts the dbus messages the publish step sends per poll cycle for a three phase inverter plus meter.
+
+The driver's own DbusRunServices._publish() is fed with synthetic poll cycles, the dbus services are replaced
+by stand-ins that count the signals velib would send: one PropertiesChanged per changed value when values are
+set one by one, one ItemsChanged per service and cycle when they're set within a `with service as s` block.
+Needs the same environment as the driver, run it on the GX device:
+
+    python /data/dbus-huaweisun2000-pvinverter/tools/benchmark_dbus.py
+"""
+
+import importlib.util
+import logging
+import os
+import random
+import sys
+
+DRIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DRIVER_DIR)
+from connector_modbus import ModbusDataCollector2000
+from settings import DEFAULT_DEADBANDS, parse_deadbands
+
+spec = importlib.util.spec_from_file_location('driver', os.path.join(DRIVER_DIR, 'dbus-huaweisun2000-pvinverter.py'))
+driver = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(driver)
+
+CYCLES = 600
+
+
+class CountingService:
+    """Stands in for VeDbusService and counts the dbus signals velib would send"""
+
+    def __init__(self, paths, batched):
+        self.values = dict(paths)
+        self.batched = batched
+        self.messages = 0
+        self._changes = None
+
+    def __getitem__(self, path):
+        return self.values[path]
+
+    def __setitem__(self, path, value):
+        if path in self.values and self.values[path] == value:
+            return
+        self.values[path] = value
+        if self.batched and self._changes is not None:
+            self._changes.add(path)
+        else:
+            self.messages += 1
+
+    def __enter__(self):
+        self._changes = set()
+        return self
+
+    def __exit__(self, *exc):
+        if self._changes:
+            self.messages += 1
+        self._changes = None
+
+
+class Settings:
+    def __init__(self, deadbands):
+        self.deadbands = deadbands
+
+    def get(self, setting):
+        return {'backoff_in_seconds': 1, 'backoff_factor': 2.0, 'update_time_ms': 1000, 'profile_seconds': 60}[setting]
+
+    def get_deadbands(self):
+        return self.deadbands
+
+
+class Device:
+    """Register values that wander by one step of their resolution now and then, like a real inverter in daylight"""
+
+    def __init__(self, registers, daylight):
+        self.daylight = daylight
+        self.values = {register: self._initial(register) for register in registers}
+
+    @staticmethod
+    def _initial(register):
+        if register.value.data_type.value.startswith('bitfield') or register.value.mapping is not None:
+            return 0x200 if register.name == 'DeviceStatus' else 0
+        return random.randint(100, 5000) / (register.value.gain or 1)
+
+    def cycle(self):
+        if self.daylight:
+            for register, value in self.values.items():
+                if isinstance(value, float) and random.random() < 0.5:
+                    self.values[register] = value + random.choice((-1, 1)) / (register.value.gain or 1)
+        return self.values
+
+
+def run(deadbands, batched, daylight):
+    random.seed(1)
+    collector = ModbusDataCollector2000(logging.getLogger('benchmark'), 'V3', system_type=1)
+    collector.pv_strings = 2
+    inverter_paths = collector._inverter_paths()
+    meter_paths = collector._meter_paths()
+    devices = {
+        'pvinverter': (Device(collector._inverter_polls(inverter_paths), daylight), lambda values: collector._build_inverter_data(inverter_paths, values)),
+        'meter': (Device(collector._meter_polls(meter_paths), daylight), lambda values: collector._build_meter_data(meter_paths, values)),
+    }
+    services = {}
+    for name, (device, build) in devices.items():
+        paths = {'/Connected': 1, '/Stale': 0, '/UpdateIndex': 0}
+        paths.update(dict.fromkeys(build(device.cycle()), None))
+        services[name] = {'name': name, 'service': CountingService(paths, batched), 'collector': collector, 'connection': collector.connection}
+    run_services = driver.DbusRunServices(services, Settings(deadbands), logging.getLogger('benchmark'))
+
+    for _ in range(CYCLES):
+        collector.rtt.update(random.uniform(0.03, 0.05))
+        for name, (device, build) in devices.items():
+            run_services._publish(services[name], build(device.cycle()))
+    return sum(service['service'].messages for service in services.values()) / CYCLES
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    deadbands = parse_deadbands(DEFAULT_DEADBANDS, logging.getLogger('benchmark'))
+    print(f"dbus messages per poll cycle (three phase inverter with 2 PV strings plus meter, {CYCLES} cycles)")
+    print(f"{'':>26} {'daylight':>9} {'night':>9}")
+    for label, bands, batched in (('every change, per value', [], False), ('deadbands, per value', deadbands, False), ('deadbands, batched', deadbands, True)):
+        print(f"{label:>26} {run(bands, batched, True):9.1f} {run(bands, batched, False):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
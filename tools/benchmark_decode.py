@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Compares decoding a poll cycle register by register (datatypes.decode) with the compiled block decoders.
+
+Run it on the GX device itself to get meaningful numbers:
+
+    python /data/dbus-huaweisun2000-pvinverter/tools/benchmark_decode.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sun2000_modbus import datatypes, planner
+from sun2000_modbus.inverter_registers import InverterRegisterV3
+
+
+def decode_per_register(blocks, payloads):
+    values = {}
+    for block, payload in zip(blocks, payloads):
+        for register in block.registers:
+            offset = block.offset(register)
+            value = datatypes.decode(payload[offset:offset + register.value.quantity * 2], register.value.data_type)
+            if register.value.gain is not None:
+                value = value / register.value.gain
+            values[register] = value
+    return values
+
+
+def decode_compiled(blocks, payloads):
+    values = {}
+    for block, payload in zip(blocks, payloads):
+        values.update(block.decode(payload))
+    return values
+
+
+def main():
+    # Everything between the PV strings and the energy yield, roughly what a cycle with string monitoring reads
+    registers = [r for r in InverterRegisterV3 if 32016 <= r.value.address <= 32115]
+    blocks = planner.plan_blocks(registers, max_gap=8)
+    payloads = [os.urandom(block.quantity * 2) for block in blocks]
+    assert decode_per_register(blocks, payloads) == decode_compiled(blocks, payloads)
+
+    number = 2000
+    print(f"{len(registers)} registers in {len(blocks)} blocks")
+    for name, function in (('per register', decode_per_register), ('compiled', decode_compiled)):
+        seconds = min(timeit.repeat(lambda: function(blocks, payloads), number=number, repeat=5))
+        print(f"{name:>12}: {seconds / number * 1e6:8.1f} µs per cycle")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Runs ModbusDataCollector2000 against tools/simulator.py and reports requests, time and CPU per poll cycle.
+
+Each scenario starts its own simulator (in a separate process, so its CPU time doesn't count) and runs the
+collector the way the driver does in poll mode 0: static data once, then inverter and meter data every cycle.
+Needs pymodbus only, no dbus, so it runs on a laptop as well:
+
+    python tools/benchmark_suite.py
+    python tools/benchmark_suite.py --cycles 500 --latency-ms 50 --scenario default --scenario pipelined
+
+Time runs ten times faster than in the driver: a cycle starts every 100 ms (--interval-ms) instead of every second,
+the slow poll interval and the reconnect backoff are scaled the same way.
+"""
+
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..'))
+from connector_modbus import ModbusDataCollector2000
+
+# name -> (description, simulator options, collector options)
+SCENARIOS = {
+    'default': ("driver defaults", {}, {}),
+    'no-gap-fill': ("only adjacent registers merged", {}, {'max_gap': 0}),
+    'burst': ("connection closed after each cycle", {'max_connections': 1}, {'burst_mode': True}),
+    'pipelined': ("4 requests in flight, gateway answering 4 at a time", {'concurrency': 4}, {'pipeline_window': 4}),
+    'lossy': ("2 % of the requests lost, 20 ms jitter", {'drop_rate': 0.02, 'jitter_ms': 20}, {}),
+}
+
+
+def percentile(samples, q):
+    """Nearest rank percentile (0..100) of a sorted list"""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, max(0, round(q / 100 * len(samples)) - 1))]
+
+
+def start_simulator(args, options):
+    """Start tools/simulator.py, return the process and the port it listens on"""
+    options = dict({'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'modbus_version': args.modbus_version,
+                    'pv_strings': args.pv_strings, 'seed': args.seed}, **options)
+    command = [sys.executable, os.path.join(TOOLS_DIR, 'simulator.py'), '--port', '0']
+    for name, value in options.items():
+        command += ['--' + name.replace('_', '-'), str(value)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Listening on "):
+        process.kill()
+        raise RuntimeError(f"The simulator didn't start: {process.stderr.read().strip()}")
+    return process, int(line.rsplit(':', 1)[1])
+
+
+def stop_simulator(process):
+    """Stop the simulator, return its statistics line"""
+    process.send_signal(signal.SIGINT)
+    try:
+        _, stderr = process.communicate(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        _, stderr = process.communicate()
+    return stderr.strip().splitlines()[-1] if stderr.strip() else ''
+
+
+def run_scenario(logger, args, simulator_options, collector_options):
+    process, port = start_simulator(args, simulator_options)
+    try:
+        # The driver's defaults are meant for a 1 s interval
+        scale = args.interval_ms / 1000
+        slow_poll_interval = args.slow_poll_interval if args.slow_poll_interval is not None else 60 * scale
+        collector = ModbusDataCollector2000(logger=logger, modbus_version=args.modbus_version, host='127.0.0.1', port=port, system_type=1,
+                                            slow_poll_interval=slow_poll_interval, backoff_in_seconds=scale, **collector_options)
+        if collector.getStaticData() is None:
+            raise RuntimeError("Couldn't read the static data")
+        collector.endCycle()
+
+        durations, cpu_times, requests, failed = [], [], [], 0
+        counters = collector.metrics.counters
+        next_cycle = time.monotonic()
+        for _ in range(args.cycles):
+            # A cycle that overran its slot is followed by the next one right away
+            time.sleep(max(0.0, next_cycle - time.monotonic()))
+            next_cycle = max(next_cycle + args.interval_ms / 1000, time.monotonic())
+            sent = counters['requests']
+            started, cpu_started = time.perf_counter(), time.process_time()
+            collector.beginCycle()
+            inverter_data = collector.getInverterData()
+            meter_data = collector.getMeterData() if args.meter else {}
+            collector.endCycle()
+            durations.append(time.perf_counter() - started)
+            cpu_times.append(time.process_time() - cpu_started)
+            requests.append(counters['requests'] - sent)
+            if inverter_data is None or meter_data is None:
+                failed += 1
+        collector.invSun2000.disconnect()
+    finally:
+        simulator_stats = stop_simulator(process)
+
+    durations.sort()
+    return {
+        'cycles': args.cycles,
+        'failed': failed,
+        'requests_per_cycle': sum(requests) / len(requests),
+        'cycle_ms': {f'p{q}': percentile(durations, q) * 1000 for q in (50, 95, 99)},
+        'max_ms': durations[-1] * 1000,
+        'cpu_ms_per_cycle': sum(cpu_times) / len(cpu_times) * 1000,
+        'errors': counters['errors'],
+        'retries': counters['retries'],
+        'reconnects': counters['reconnects'],
+        'simulator': simulator_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the Modbus poll path against the simulator")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help="run only these scenarios (repeatable)")
+    parser.add_argument('--cycles', type=int, default=100)
+    parser.add_argument('--interval-ms', type=float, default=100, help="poll interval")
+    parser.add_argument('--slow-poll-interval', type=float, help="seconds, default 60 scaled like the interval")
+    parser.add_argument('--latency-ms', type=float, default=10, help="simulated time to answer a request")
+    parser.add_argument('--jitter-ms', type=float, default=2, help="mean simulated extra delay")
+    parser.add_argument('--modbus-version', default='V3', choices=('V2', 'V3'))
+    parser.add_argument('--pv-strings', type=int, default=2)
+    parser.add_argument('--no-meter', dest='meter', action='store_false', help="don't read the power meter")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="also write the results to this file, e.g. to compare two versions")
+    parser.add_argument('--verbose', action='store_true', help="show the collector's log")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(levelname)s - %(message)s")
+    logger = logging.getLogger('benchmark')
+    logger.setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+
+    print(f"{args.cycles} cycles per scenario, {args.latency_ms:g} ms latency + {args.jitter_ms:g} ms jitter per request, register map {args.modbus_version}")
+    print(f"{'scenario':<12} {'req/cycle':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'CPU ms':>7} {'failed':>6} {'retries':>7}  description")
+    results = {}
+    for name in args.scenario or SCENARIOS:
+        description, simulator_options, collector_options = SCENARIOS[name]
+        result = results[name] = run_scenario(logger, args, simulator_options, collector_options)
+        cycle_ms = result['cycle_ms']
+        print(f"{name:<12} {result['requests_per_cycle']:>9.2f} {cycle_ms['p50']:>8.1f} {cycle_ms['p95']:>8.1f} {cycle_ms['p99']:>8.1f} {result['max_ms']:>8.1f} "
+              f"{result['cpu_ms_per_cycle']:>7.2f} {result['failed']:>6} {result['retries']:>7}  {description}", flush=True)
+        if args.verbose:
+            print(f"    simulator: {result['simulator']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
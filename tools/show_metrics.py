@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Prints the metrics of the running driver: request latencies per block, retries, errors, bytes, decode and cycle time.
+
+    python /data/dbus-huaweisun2000-pvinverter/tools/show_metrics.py
+"""
+
+import socket
+import sys
+
+SOCKET = '/run/dbus-huaweisun2000-pvinverter.metrics'
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else SOCKET
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path)
+        chunks = []
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    print(b''.join(chunks).decode(), end='')
+
+
+if __name__ == "__main__":
+    main()
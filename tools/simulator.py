@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+"""Modbus TCP simulator of a SUN2000 inverter with power meter and battery, to run the driver without the real thing.
+
+Serves the registers of InverterRegisterV2 or V3 plus MeterRegister and BatteryRegister with values of a plant on a
+sunny day that change slowly over time. Latency, jitter, lost requests and the connection limit of the SDongle can
+be simulated:
+
+    python tools/simulator.py --port 5020 --latency-ms 30 --jitter-ms 20 --drop-rate 0.01 --max-connections 1
+
+then point the driver (or connector_modbus.py) at it, or run tools/benchmark_suite.py. Only "read holding
+registers" is supported, like in the driver.
+"""
+
+import argparse
+import heapq
+import logging
+import math
+import os
+import random
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from sun2000_modbus import battery_registers, inverter_registers, meter_registers
+from sun2000_modbus.datatypes import DataType, STRUCT_FORMATS
+from sun2000_modbus.modbus_tcp import MBAP_HEADER, READ_HOLDING_REGISTERS, FrameDecoder
+
+# Modbus exception codes
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+
+# Most registers per request the protocol allows
+MAX_QUANTITY = 125
+
+# Values are in W, var and VA, these units take a thousandth of that
+SCALE = {'kW': 0.001, 'kvar': 0.001, 'kVA': 0.001}
+
+RANGES = {'H': (0, 0xFFFF), 'I': (0, 0xFFFFFFFF), 'h': (-0x8000, 0x7FFF), 'i': (-0x80000000, 0x7FFFFFFF)}
+
+
+def encode(register, value):
+    """The register's words for value (in the register's unit, W instead of kW), as big endian bytes"""
+    size = register.value.quantity * 2
+    data_type = register.value.data_type
+    if data_type == DataType.STRING:
+        return str(value).encode()[:size].ljust(size, b'\0')
+    fmt = STRUCT_FORMATS.get(data_type)
+    if fmt is None:
+        # Multidata, e.g. the time of use periods
+        return bytes(size)
+    gain = register.value.gain if register.value.gain is not None else 1
+    low, high = RANGES[fmt]
+    raw = min(max(round(value * SCALE.get(register.value.unit, 1) * gain), low), high)
+    return struct.pack('>' + fmt, raw)
+
+
+class Plant:
+    """An inverter with a few PV strings, a three phase power meter and a battery on a sunny day with some clouds"""
+
+    def __init__(self, pv_strings=2, rated_power=10000, seed=None):
+        self.pv_strings = pv_strings
+        self.rated_power = rated_power
+        self.random = random.Random(seed)
+        self.started = time.monotonic()
+        self._last = self.started
+        self.energy_yield = 12345.67  # kWh
+        self.daily_yield = 0.0
+        self.energy_imported = 4321.0
+        self.energy_exported = 6789.0
+        self.soc = 55.0
+
+    def values(self):
+        """Register name -> value of the inverter, meter and battery registers, as dicts"""
+        now = time.monotonic()
+        t, dt = now - self.started, now - self._last
+        self._last = now
+        jitter = self.random.gauss
+
+        # Clouds pass every few minutes
+        pv_power = self.rated_power * max(0.05, 0.7 + 0.2 * math.sin(2 * math.pi * t / 300) + jitter(0, 0.01))
+        active_power = pv_power * 0.975
+        load = 1500 + 300 * math.sin(2 * math.pi * t / 45) + jitter(0, 20)
+        battery_power = min(5000.0, max(-5000.0, (active_power - load) * 0.5))  # > 0 charging
+        grid_power = active_power - load - battery_power  # > 0 feeding in
+        frequency = 50 + 0.02 * math.sin(2 * math.pi * t / 7)
+        phase_voltages = [230 + 1.5 * math.sin(2 * math.pi * t / 60 + n) + jitter(0, 0.2) for n in range(3)]
+
+        self.energy_yield += active_power * dt / 3600000
+        self.daily_yield += active_power * dt / 3600000
+        if grid_power > 0:
+            self.energy_exported += grid_power * dt / 3600000
+        else:
+            self.energy_imported -= grid_power * dt / 3600000
+        self.soc = min(100.0, max(5.0, self.soc + battery_power * dt / 3600 / 10000 * 100))
+
+        inverter = {
+            'Model': 'SUN2000-10KTL-M1',
+            'SN': 'HV2150000001',
+            'PN': '01075342',
+            'ModelID': 424,
+            'NumberOfPVStrings': self.pv_strings,
+            'NumberOfMPPTrackers': min(self.pv_strings, 2),
+            'RatedPower': self.rated_power,
+            'MaximumActivePower': self.rated_power * 1.1,
+            'MaximumApparentPower': self.rated_power * 1.1,
+            'InputPower': pv_power,
+            'ActivePower': active_power,
+            'PeakActivePowerOfCurrentDay': self.rated_power * 0.92,
+            'ReactivePower': 0,
+            'PowerFactor': 0.999,
+            'GridFrequency': frequency,
+            'Efficiency': 97.5,
+            'InternalTemperature': 45 + 5 * pv_power / self.rated_power,
+            'InsulationResistance': 3.0,
+            'DeviceStatus': 0x0200,  # On-grid
+            'AccumulatedEnergyYield': self.energy_yield,
+            'DailyEnergyYield': self.daily_yield,
+            'SystemTime': int(time.time()),
+            'PowerMeterCollectionActivePower': grid_power,
+        }
+        for n in range(1, self.pv_strings + 1):
+            voltage = 400 + 10 * math.sin(2 * math.pi * t / 120) + 3 * n + jitter(0, 0.5)
+            inverter[f'PV{n}Voltage'] = voltage
+            inverter[f'PV{n}Current'] = pv_power / self.pv_strings / voltage
+        for phase, voltage in zip('ABC', phase_voltages):
+            inverter[f'Phase{phase}Voltage'] = voltage
+            inverter[f'Phase{phase}Current'] = active_power / 3 / voltage
+        for a, b in ('AB', 'BC', 'CA'):
+            inverter[f'LineVoltageBetweenPhases{a}And{b}'] = 230 * math.sqrt(3)
+
+        meter = {
+            'MeterStatus': 1,  # online
+            'MeterType': 1,  # three phase
+            'ActivePower': grid_power,
+            'ReactivePower': 0,
+            'PowerFactor': 0.98,
+            'GridFrequency': frequency,
+            'PositiveActiveElectricity': self.energy_exported,
+            'ReverseActivePower': self.energy_imported,
+        }
+        for phase, voltage in zip('ABC', phase_voltages):
+            meter[f'{phase}PhaseVoltage'] = voltage
+            meter[f'{phase}PhaseCurrent'] = grid_power / 3 / voltage
+            meter[f'{phase}PhaseActivePower'] = grid_power / 3
+        for line in ('AB', 'BC', 'CA'):
+            meter[f'{line}LineVoltage'] = 230 * math.sqrt(3)
+
+        battery = {
+            'RunningStatus': 2,  # running
+            'BusVoltage': 450,
+            'BusCurrent': battery_power / 450,
+            'ChargeDischargePower': battery_power,
+            'MaximumChargePower': 5000,
+            'MaximumDischargePower': 5000,
+            'RatedCapacity': 10000,
+            'SOC': self.soc,
+            'BackupPowerSOC': 20,
+            'TotalCharge': 1500.0,
+            'TotalDischarge': 1400.0,
+        }
+        return inverter, meter, battery
+
+
+class RegisterImage:
+    """All 65536 holding registers as big endian bytes, kept up to date with the plant's values"""
+
+    def __init__(self, plant, register_maps, unsupported=(), refresh=0.1):
+        self.plant = plant
+        self.register_maps = register_maps  # inverter, meter, battery
+        self.refresh = refresh
+        self.data = bytearray(0x10000 * 2)
+        self._updated = None
+        self._lock = threading.Lock()
+        # Address ranges answered with "illegal data address"
+        self.unsupported = [(r.value.address, r.value.address + r.value.quantity)
+                            for register_map in register_maps for r in register_map if r.name in unsupported]
+
+    def read(self, address, quantity):
+        """The payload of a read of quantity registers at address, or a Modbus exception code"""
+        if not 1 <= quantity <= MAX_QUANTITY or address + quantity > 0x10000:
+            return ILLEGAL_DATA_VALUE
+        if any(start < address + quantity and address < end for start, end in self.unsupported):
+            return ILLEGAL_DATA_ADDRESS
+        with self._lock:
+            now = time.monotonic()
+            if self._updated is None or now - self._updated >= self.refresh:
+                self._update()
+                self._updated = now
+            return bytes(self.data[address * 2:(address + quantity) * 2])
+
+    def _update(self):
+        for register_map, values in zip(self.register_maps, self.plant.values()):
+            for name, value in values.items():
+                if name in register_map.__members__:
+                    register = register_map[name]
+                    self.data[register.value.address * 2:(register.value.address + register.value.quantity) * 2] = encode(register, value)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """One client connection. Requests are answered in order of their completion, up to concurrency at a time."""
+
+    def setup(self):
+        self.simulator = self.server.simulator
+        # Replies go out as soon as they're due, not when the client acknowledged the previous one
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.replies = []  # heap of (due, sequence, transaction id, unit, pdu)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.slots = [0.0] * self.simulator.concurrency  # heap of the times the request slots become free
+        self.sequence = 0
+
+    def handle(self):
+        writer = threading.Thread(target=self._write, daemon=True)
+        writer.start()
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = self.request.recv(4096)
+                if not data:
+                    break
+                for transaction_id, unit, pdu in decoder.feed(data):
+                    self._schedule(transaction_id, unit, pdu)
+        except OSError:
+            pass
+        finally:
+            with self.condition:
+                self.closed = True
+                self.condition.notify()
+            writer.join()
+
+    def _schedule(self, transaction_id, unit, pdu):
+        simulator = self.simulator
+        simulator.count('requests')
+        if simulator.random.random() < simulator.drop_rate:
+            simulator.count('dropped')
+            return
+        now = time.monotonic()
+        started = max(now, heapq.heappop(self.slots))
+        due = started + simulator.delay()
+        heapq.heappush(self.slots, due)
+        with self.condition:
+            self.sequence += 1
+            heapq.heappush(self.replies, (due, self.sequence, transaction_id, unit, pdu))
+            self.condition.notify()
+
+    def _write(self):
+        while True:
+            with self.condition:
+                while not self.closed and (not self.replies or self.replies[0][0] > time.monotonic()):
+                    self.condition.wait(self.replies[0][0] - time.monotonic() if self.replies else None)
+                if self.closed:
+                    return
+                _, _, transaction_id, unit, pdu = heapq.heappop(self.replies)
+            reply = self.simulator.answer(pdu)
+            try:
+                self.request.sendall(MBAP_HEADER.pack(transaction_id, 0, len(reply) + 1, unit) + reply)
+            except OSError:
+                return
+
+    def finish(self):
+        self.simulator.disconnected()
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, simulator):
+        self.simulator = simulator
+        super().__init__(address, _Handler)
+
+    def verify_request(self, request, client_address):
+        return self.simulator.connected(client_address)
+
+
+class Simulator:
+    def __init__(self, logger, host='127.0.0.1', port=5020, modbus_version='V3', pv_strings=2, rated_power=10000, latency_ms=0, jitter_ms=0,
+                 drop_rate=0.0, max_connections=0, concurrency=1, unsupported=(), seed=None):
+        self.logger = logger
+        self.latency = latency_ms / 1000
+        # Extra delay on top of the latency, exponentially distributed like the delays of a WLAN
+        self.jitter = jitter_ms / 1000
+        self.drop_rate = drop_rate
+        # The SDongle only accepts a single connection, 0 = unlimited
+        self.max_connections = max_connections
+        # Requests worked on at the same time per connection, an inverter takes one at a time, a SmartLogger several
+        self.concurrency = max(1, concurrency)
+        self.random = random.Random(seed)
+        register_maps = (inverter_registers.InverterRegister.get(modbus_version), meter_registers.MeterRegister, battery_registers.BatteryRegister)
+        self.image = RegisterImage(Plant(pv_strings=pv_strings, rated_power=rated_power, seed=seed), register_maps, unsupported=unsupported)
+        self.stats = dict.fromkeys(('connections', 'rejected', 'requests', 'dropped', 'exceptions'), 0)
+        self.clients = 0
+        self._lock = threading.Lock()
+        self.server = _Server((host, port), self)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def delay(self):
+        return self.latency + (self.random.expovariate(1 / self.jitter) if self.jitter else 0)
+
+    def connected(self, client_address):
+        with self._lock:
+            if self.max_connections and self.clients >= self.max_connections:
+                self.stats['rejected'] += 1
+                self.logger.info(f"Rejecting {client_address[0]}:{client_address[1]}, already {self.clients} connection(s)")
+                return False
+            self.clients += 1
+            self.stats['connections'] += 1
+        return True
+
+    def disconnected(self):
+        with self._lock:
+            self.clients -= 1
+
+    def answer(self, pdu):
+        """The response PDU for a request PDU"""
+        function_code = pdu[0]
+        if function_code != READ_HOLDING_REGISTERS or len(pdu) < 5:
+            self.count('exceptions')
+            return bytes((function_code | 0x80, ILLEGAL_FUNCTION))
+        address, quantity = struct.unpack_from('>HH', pdu, 1)
+        payload = self.image.read(address, quantity)
+        if isinstance(payload, int):
+            self.count('exceptions')
+            return bytes((function_code | 0x80, payload))
+        return bytes((function_code, len(payload))) + payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modbus TCP simulator of a SUN2000 inverter with power meter and battery")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5020, help="0 picks a free port")
+    parser.add_argument('--modbus-version', default='V3', choices=('V2', 'V3'), help="inverter register map")
+    parser.add_argument('--pv-strings', type=int, default=2)
+    parser.add_argument('--rated-power', type=int, default=10000, help="W")
+    parser.add_argument('--latency-ms', type=float, default=0, help="time to answer a request")
+    parser.add_argument('--jitter-ms', type=float, default=0, help="mean of an exponentially distributed extra delay")
+    parser.add_argument('--drop-rate', type=float, default=0, help="share of requests that are never answered")
+    parser.add_argument('--max-connections', type=int, default=0, help="0 = unlimited, the SDongle takes 1")
+    parser.add_argument('--concurrency', type=int, default=1, help="requests answered in parallel per connection")
+    parser.add_argument('--unsupported', default='', help="comma separated register names answered with illegal data address")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(asctime)s %(levelname)s - %(message)s")
+    logger = logging.getLogger('simulator')
+    simulator = Simulator(logger, host=args.host, port=args.port, modbus_version=args.modbus_version, pv_strings=args.pv_strings, rated_power=args.rated_power,
+                          latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, drop_rate=args.drop_rate, max_connections=args.max_connections,
+                          concurrency=args.concurrency, unsupported=[name.strip() for name in args.unsupported.split(',') if name.strip()], seed=args.seed)
+    host, port = simulator.address
+    # tools/benchmark_suite.py reads the port from this line
+    print(f"Listening on {host}:{port}", flush=True)
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(' '.join(f"{name}={value}" for name, value in simulator.stats.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Please adhere to flake8 --ignore E501,E402
+
+import json
+import os
+import time
+
+
+def device_key(collector):
+    """Identifies a device across restarts"""
+    return f"{collector.connection[0]}:{collector.connection[1]}:{collector.modbus_unit}"
+
+
+class WarmStartSnapshot:
+    """Static device data and the last published values, persisted so a restart can register the dbus services right away.
+
+    The file is rewritten at most every save_interval seconds to spare the flash in /data. Values
+    older than max_value_age seconds aren't restored, static data always is.
+    """
+
+    def __init__(self, logger, path, save_interval=300, max_value_age=3600):
+        self.logger = logger
+        self.path = path
+        self.save_interval = save_interval
+        self.max_value_age = max_value_age
+        self.devices = {}  # device_key() -> static data
+        self.services = {}  # service name -> {dbus path: value}
+        self.saved = None  # wall clock time the loaded snapshot was written
+        self._last_save = None
+
+    def load(self):
+        """Read the snapshot file, returns False if there is none"""
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+            self.devices = snapshot['devices']
+            self.saved = snapshot['saved']
+            if time.time() - self.saved <= self.max_value_age:
+                self.services = snapshot['services']
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return False
+        return True
+
+    def update(self, name, values):
+        """Remember the values published for a service, saves the snapshot if it's due.
+
+        values may be just the paths that changed, they're merged into what is already known.
+        """
+        self.services.setdefault(name, {}).update(values)
+        if self._last_save is None or time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        self._last_save = time.monotonic()
+        try:
+            # Write to a temporary file first, a power cut must not leave a truncated snapshot behind
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump({'saved': time.time(), 'devices': self.devices, 'services': self.services}, f)
+            os.replace(self.path + '.tmp', self.path)
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.warning(f"Couldn't write snapshot {self.path}: {e}")